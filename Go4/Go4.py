@@ -6,7 +6,9 @@ sys.path.append(utilpath)
 from gtp_connection import GtpConnection  
 from board_util_go4 import GoBoardUtilGo4
 from simple_board import SimpleGoBoard
+from bit_board import BitGoBoard
 from ucb import runUcb
+from feature import move_prob_cache, check_features_weight
 import numpy as np
 import argparse
 import sys
@@ -17,12 +19,16 @@ parser.add_argument('--sim', type=int, default=10, help='number of simulations p
 parser.add_argument('--moveselect', type=str, default='simple', help='type of move selection: simple or ucb')
 parser.add_argument('--simulations', type=str, default='random', help='type of simulation policy: random or rulebased or probabilistic')
 parser.add_argument('--movefilter', action='store_true', default=False, help='whether use move filter or not')
+parser.add_argument('--board', type=str, default='array', help='board implementation: array or bit (bitboards, for boards up to 9x9)')
+parser.add_argument('--prior_cache', type=int, default=move_prob_cache.capacity, help='positions whose feature-based move probabilities are cached, 0 turns the cache off')
 
 args = parser.parse_args()
 num_simulation = args.sim
 move_select = args.moveselect
 simulations = args.simulations
 move_filter = args.movefilter
+board_type = args.board
+prior_cache = args.prior_cache
 
 # pair = (move, percentage)
 def byPercentage(pair):
@@ -84,6 +90,7 @@ class Go4Player(object):
         return wins
     
     def get_move(self, board, toplay):
+        check_features_weight()
         cboard = board.copy()
         emptyPoints = board.get_empty_points()
         moves = []
@@ -115,7 +122,11 @@ def run():
     """
     start the gtp connection and wait for commands.
     """
-    board = SimpleGoBoard(7)
+    if board_type == 'bit':
+        board = BitGoBoard(7)
+    else:
+        board = SimpleGoBoard(7)
+    move_prob_cache.resize(prior_cache)
     con = GtpConnection(Go4Player(num_simulation), board)
     con.start_connection()
 
@@ -126,5 +137,11 @@ if __name__=='__main__':
     if simulations != "random" and simulations != "rulebased" and simulations != "probabilistic":
         print('simulations must be random or rulebased or probabilistic')
         sys.exit(0)
+    if board_type != "array" and board_type != "bit":
+        print('board must be array or bit')
+        sys.exit(0)
+    if prior_cache < 0:
+        print('prior_cache must be at least 0')
+        sys.exit(0)
     run()
 
@@ -38,11 +38,15 @@ class GoBoardUtilGo4(GoBoardUtil):
     def generate_moves_with_feature_based_probs(board):
         from feature import Features_weight
         from feature import Feature
+        from feature import move_prob_cache
         assert len(Features_weight) != 0
+        color = board.current_player
+        cached = move_prob_cache.get(board, color)
+        if cached is not None:
+            return cached
         moves = []
         gamma_sum = 0.0
         empty_points = board.get_empty_points()
-        color = board.current_player
         probs = np.zeros(board.maxpoint)
         all_board_features = Feature.find_all_features(board)
         for move in empty_points:
@@ -54,6 +58,7 @@ class GoBoardUtilGo4(GoBoardUtil):
             assert gamma_sum != 0.0
             for m in moves:
                 probs[m] = probs[m] / gamma_sum
+        move_prob_cache.store(board, color, moves, probs)
         return moves, probs
     
     @staticmethod
@@ -1,5 +1,6 @@
 import numpy as np
 import os,sys
+import collections
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, FLOODFILL
 from pattern import pat3set
 from pattern import patIndex
@@ -40,16 +41,126 @@ Features_weight = np.empty(shape = (0))
 sys.path.insert(0,os.path.__file__)
 dirpath = os.path.dirname(os.path.realpath(__file__))
 filepath=os.path.join(dirpath,"features_weight.dat")
-if os.path.isfile(filepath):
-    sys.stderr.write("Load Features_weight from features_weight.dat ...")
-    data = np.loadtxt(filepath)
-    Features_weight = np.ones(len(data))
-    for i in range(len(Features_weight)):
-        Features_weight[i] = data[i][1]
-else:
-    print("No features weight file...")
-
-lastBoardRec=[]
+# (mtime, size) of the features_weight.dat that Features_weight holds
+_weight_stamp = None
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def load_features_weight():
+    """
+    (Re)load Features_weight from features_weight.dat. The weights are a
+    new array, which tells MoveProbCache to drop the probabilities of the
+    old weights.
+    """
+    global Features_weight, _weight_stamp
+    _weight_stamp = _file_stamp(filepath)
+    if _weight_stamp is not None:
+        sys.stderr.write("Load Features_weight from features_weight.dat ...")
+        data = np.loadtxt(filepath)
+        Features_weight = np.ones(len(data))
+        for i in range(len(Features_weight)):
+            Features_weight[i] = data[i][1]
+    else:
+        Features_weight = np.empty(shape = (0))
+        # stdout is the GTP channel
+        sys.stderr.write("No features weight file...\n")
+
+def check_features_weight():
+    """
+    Reload Features_weight when features_weight.dat changed on disk since
+    it was loaded. Cheap enough to call before every search.
+    """
+    if _file_stamp(filepath) != _weight_stamp:
+        load_features_weight()
+        return True
+    return False
+
+load_features_weight()
+
+class MoveProbCache(object):
+    """
+    LRU cache of the (moves, probs) move generation computes from the
+    features of a position, so a position seen again by the search does
+    not pay for find_all_features a second time.
+
+    Positions are keyed by the board size, zobrist_key (stones, side to
+    move and ko), the color to play and the last two moves, which the
+    distance features depend on. Boards checking superko are not cached,
+    their legal moves also depend on the history. An entry holds the legal
+    moves as an int16 array and their probabilities, the full probs array
+    is rebuilt on a hit. Entries belong to the Features_weight they were
+    computed with, the cache empties itself when the weights are reloaded.
+    capacity 0 turns the cache off.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._weights = Features_weight
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(board, color):
+        if board.check_superko:
+            return None
+        return (board.size, board.zobrist_key, color, board.last_move, board.last2_move)
+
+    def get(self, board, color):
+        """
+        (moves, probs) of color on board, or None when not cached.
+        """
+        if self.capacity == 0:
+            return None
+        if self._weights is not Features_weight:
+            self.clear()
+        key = self._key(board, color)
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        moves, move_probs = entry
+        probs = np.zeros(board.maxpoint)
+        probs[moves] = move_probs
+        return moves.tolist(), probs
+
+    def store(self, board, color, moves, probs):
+        if self.capacity == 0:
+            return
+        key = self._key(board, color)
+        if key is None:
+            return
+        self._entries[key] = (np.array(moves, dtype=np.int16), probs[moves])
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        while len(self._entries) > capacity:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self._entries.clear()
+        self._weights = Features_weight
+
+# positions the move generation keeps, see MoveProbCache
+PROB_CACHE_SIZE = 10000
+move_prob_cache = MoveProbCache(PROB_CACHE_SIZE)
+
+lastBoardKey=None
 patternWeightRec={}
 
 class Feature(object):
@@ -115,7 +226,7 @@ class Feature(object):
         """
         Find all move's features on the board
         """
-        global lastBoardRec,patternWeightRec
+        global lastBoardKey,patternWeightRec
         legal_moves = Feature.legal_moves_on_board(board)
         features = {}
         features["PASS"] = []
@@ -125,10 +236,8 @@ class Feature(object):
         Feature.find_full_board_features(features, board)
         Feature.find_dist_prev_move_features(features, board, legal_moves)
         Feature.find_line_pos_features(features, board, legal_moves)
-        compare=board.board!=lastBoardRec
-        diff=np.sum(compare)
-        #diffwhere=np.where(compare)
-        if(0 and lastBoardRec!=[] and diff==0):
+        same_board = board.zobrist_key == lastBoardKey
+        if(0 and same_board):
             for m in legal_moves:
                 if m in patternWeightRec:
                     for f in patternWeightRec[m]:
@@ -160,7 +269,7 @@ class Feature(object):
             for m in legal_moves:
                 patternWeightRec[m]=[]
                 Feature.find_pattern_feature(features, board, m)
-            lastBoardRec=board.board.copy()
+            lastBoardKey=board.zobrist_key
         return features
 
     @staticmethod
@@ -292,11 +401,7 @@ class Feature(object):
 
     @staticmethod
     def distance_to_line(board, p):
-        halfSize = (board.size + 1)/2
-        row, col = board._point_to_coord(p)
-        lineRow = board.size + 1 - row if row > halfSize else row
-        lineCol = board.size + 1 - col if col > halfSize else col
-        return min(lineRow, lineCol)
+        return board._geometry.line[p]
 
     @staticmethod
     def set_distance_last_move(features, board, legal_moves):
@@ -8,8 +8,13 @@ sys.path.append(utilpath)
 from gtp_connection2 import GtpConnection2
 from board_util_go4 import GoBoardUtilGo4
 from simple_board import SimpleGoBoard
-from mcts import MCTS
+from bit_board import BitGoBoard
+from mcts import MCTS, RootParallelMCTS, node_depth
+from time_control import TimeControl
+from feature import move_prob_cache
 import numpy as np
+import time
+import threading
 import argparse
 
 parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -17,20 +22,43 @@ parser.add_argument('--num_total_sim', type=int, default=300, help='number of si
 parser.add_argument('--simulations', type=str, default='random', help='type of simulation policy: random or rulebased or probabilistic')
 parser.add_argument('--movefilter', action='store_true', default=False, help='whether use move filter or not')
 parser.add_argument('--in_tree_knowledge', type=str, default='None', help='whether use move knowledge to initial a new node or not')
+parser.add_argument('--playout', type=str, default='copy', help='how playouts reset the board: copy (restore a snapshot) or undo (unwind the moves)')
+parser.add_argument('--board', type=str, default='array', help='board implementation: array or bit (bitboards, for boards up to 9x9)')
+parser.add_argument('--tree', type=str, default='node', help='MCTS tree storage: node (TreeNode objects) or array (NumPy buffers)')
+parser.add_argument('--workers', type=int, default=1, help='number of rollout worker processes for tree-parallel MCTS, 1 searches serially')
+parser.add_argument('--root_workers', type=int, default=1, help='number of worker processes for root-parallel MCTS, each searching with its share of the simulations')
+parser.add_argument('--leaf_rollouts', type=int, default=1, help='number of rollouts run at once from every leaf on a pool of worker processes, 1 runs one rollout in this process')
+parser.add_argument('--no_early_stop', action='store_true', default=False, help='run all num_total_sim simulations even when the best move is already certain')
+parser.add_argument('--expand_threshold', type=int, default=0, help='visits, prior visits included, before an MCTS leaf is expanded; 0 expands on the first visit')
+parser.add_argument('--widen_k', type=int, default=0, help='progressive widening: MCTS nodes start with children for the widen_k most probable moves; 0 creates all children')
+parser.add_argument('--widen_rate', type=float, default=2.0, help='progressive widening: one more child each time the visits of a node grow by this factor')
+parser.add_argument('--node_budget', type=int, default=0, help='most MCTS nodes kept, the least visited subtrees are pruned past it; 0 for no limit (node tree without tt_size only)')
+parser.add_argument('--ponder', action='store_true', default=False, help='keep searching in the background while waiting for the opponent')
+parser.add_argument('--move_time', type=float, default=0, help='seconds per move, 0 plays num_total_sim simulations per move; GTP time_settings overrides it')
+parser.add_argument('--prior_cache', type=int, default=move_prob_cache.capacity, help='positions whose feature-based move probabilities are cached, 0 turns the cache off')
+parser.add_argument('--tt_size', type=int, default=0, help='share MCTS nodes between transpositions through a table of this many positions, 0 for a plain tree (node tree only)')
 
 
 args = parser.parse_args()
 num_simulation = args.num_total_sim
 simulations = args.simulations
 move_filter = args.movefilter
+board_type = args.board
 in_tree_knowledge = args.in_tree_knowledge
-
-def count_at_depth(node, depth, nodesAtDepth):
-    if not node._expanded:
-        return
-    nodesAtDepth[depth] += 1
-    for _,child in node._children.items():
-        count_at_depth(child, depth+1, nodesAtDepth)
+playout_mode = args.playout
+tree_type = args.tree
+tt_size = args.tt_size
+workers = args.workers
+root_workers = args.root_workers
+leaf_rollouts = args.leaf_rollouts
+move_time = args.move_time
+early_stop = not args.no_early_stop
+ponder = args.ponder
+node_budget = args.node_budget
+expand_threshold = args.expand_threshold
+widen_k = args.widen_k
+widen_rate = args.widen_rate
+prior_cache = args.prior_cache
 
 class Go5Player():
     def __init__(self, num_simulation, limit=100, exploration = 0.4):
@@ -46,7 +74,10 @@ class Go5Player():
         """
         self.name = "Go5"
         self.version = 0.22
-        self.MCTS = MCTS()
+        self.tree_type = tree_type
+        self.tt_size = tt_size
+        self.node_budget = node_budget
+        self.MCTS = MCTS(self.tree_type, self.tt_size, self.node_budget)
         self.num_simulation = num_simulation
         self.limit = limit
         self.exploration = exploration 
@@ -54,7 +85,22 @@ class Go5Player():
         self.use_pattern = True
         self.check_selfatari = move_filter
         self.in_tree_knowledge = in_tree_knowledge
+        self.playout_mode = playout_mode
+        self.workers = workers
+        self.root_workers = root_workers
+        self.leaf_rollouts = leaf_rollouts
+        self.root_parallel = None
+        self.time_control = TimeControl(move_time)
+        self.early_stop = early_stop
+        self.expand_threshold = expand_threshold
+        self.widen_k = widen_k
+        self.widen_rate = widen_rate
+        self.ponder = ponder
+        self._ponder_thread = None
+        self._ponder_stop = None
         self.parent = None
+        # nodes at each depth of the tree of the last search, see last_node_depth
+        self._node_depth = None
 
     def sample_run(self, board, toplay, print_info=False):
         self.MCTS.exploration = self.exploration
@@ -63,41 +109,165 @@ class Go5Player():
         self.MCTS.use_pattern = True
         self.MCTS.check_selfatari = True
 
+        snapshot = board.snapshot()
+        board_copy = board.copy()
         for n in range(self.num_simulation):
-            board_copy = board.copy()
+            board_copy.restore(snapshot)
             self.MCTS._playout(board_copy, toplay)
 
         if print_info:
             self.MCTS.good_print(board, self.MCTS._root, toplay,self.num_nodes)
 
     def reset(self):
-        self.MCTS = MCTS()
+        self.MCTS.close()
+        self.MCTS = MCTS(self.tree_type, self.tt_size, self.node_budget)
+        if self.root_parallel is not None:
+            self.root_parallel.reset()
 
-    def update(self, move):
-        self.parent = self.MCTS._root 
-        self.MCTS.update_with_move(move)
+    def update(self, move, color=None):
+        self.MCTS.update_with_move(move, color)
+        if self.root_parallel is not None:
+            self.root_parallel.update_with_move(move, color)
+
+    def play(self, move, color):
+        """
+        The GTP connection played move for color on the board, None for a
+        pass. The tree moves down to the move's subtree, or starts over
+        when it was built for the other color to play.
+        """
+        self.update(move, color)
+
+    def start_pondering(self, board):
+        """
+        Search board in a background thread while the GTP connection waits
+        for a command. Only when the tree is rooted at board, i.e. the
+        root's color to play is board's, and not with root-parallel search.
+        The ponder search runs in this process.
+        """
+        if (not self.ponder or self.root_workers > 1 or self._ponder_thread is not None
+                or self.MCTS.toplay != board.current_player):
+            return
+        self._ponder_stop = threading.Event()
+        self._ponder_thread = threading.Thread(target=self.MCTS.ponder,
+                args=(board.copy(), board.current_player, self._ponder_stop),
+                kwargs=dict(komi=self.komi,
+                    limit=self.limit,
+                    check_selfatari=self.check_selfatari,
+                    use_pattern=self.use_pattern,
+                    exploration = self.exploration,
+                    simulation_policy = self.simulation_policy,
+                    # MCTS prints a note for it, nothing may go to stdout between commands
+                    in_tree_knowledge = 'None',
+                    playout_mode = self.playout_mode,
+                    # a process forked from the ponder thread would hang
+                    # closing stdin, which the main thread holds in readline
+                    workers = 1,
+                    leaf_rollouts = 1,
+                    expand_threshold = self.expand_threshold,
+                    widen_k = self.widen_k,
+                    widen_rate = self.widen_rate))
+        self._ponder_thread.daemon = True
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """
+        Stop the background search after its current playout.
+        """
+        if self._ponder_thread is None:
+            return
+        self._ponder_stop.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
 
     def get_move(self, board, toplay):
-        move = self.MCTS.get_move(board,
-                toplay,
-                komi=self.komi,
-                limit=self.limit,
-                check_selfatari=self.check_selfatari,
-                use_pattern=self.use_pattern,
-                num_simulation = self.num_simulation,
-                exploration = self.exploration,
-                simulation_policy = self.simulation_policy,
-                in_tree_knowledge = self.in_tree_knowledge)
+        start = time.time()
+        budget = self.time_control.budget(board, toplay)
+        if budget is None:
+            num_simulation = self.num_simulation
+            deadline = max_deadline = None
+        else:
+            # the clock alone ends a timed search
+            num_simulation = sys.maxsize
+            deadline = start + budget[0]
+            max_deadline = start + budget[1]
+        if self.root_workers > 1:
+            if self.root_parallel is None:
+                self.root_parallel = RootParallelMCTS(self.root_workers, self.tree_type, self.tt_size,
+                                                      node_budget=self.node_budget)
+            move = self.root_parallel.get_move(board,
+                    toplay,
+                    komi=self.komi,
+                    limit=self.limit,
+                    check_selfatari=self.check_selfatari,
+                    use_pattern=self.use_pattern,
+                    num_simulation = num_simulation,
+                    exploration = self.exploration,
+                    simulation_policy = self.simulation_policy,
+                    in_tree_knowledge = self.in_tree_knowledge,
+                    playout_mode = self.playout_mode,
+                    deadline = deadline,
+                    max_deadline = max_deadline,
+                    early_stop = False,
+                    expand_threshold = self.expand_threshold,
+                    widen_k = self.widen_k,
+                    widen_rate = self.widen_rate)
+        else:
+            move = self.MCTS.get_move(board,
+                    toplay,
+                    komi=self.komi,
+                    limit=self.limit,
+                    check_selfatari=self.check_selfatari,
+                    use_pattern=self.use_pattern,
+                    num_simulation = num_simulation,
+                    exploration = self.exploration,
+                    simulation_policy = self.simulation_policy,
+                    in_tree_knowledge = self.in_tree_knowledge,
+                    playout_mode = self.playout_mode,
+                    workers = self.workers,
+                    leaf_rollouts = self.leaf_rollouts,
+                    deadline = deadline,
+                    max_deadline = max_deadline,
+                    early_stop = self.early_stop,
+                    expand_threshold = self.expand_threshold,
+                    widen_k = self.widen_k,
+                    widen_rate = self.widen_rate)
+        self.parent = self.MCTS._root 
+        self._node_depth = None
+        if self.node_budget > 0:
+            # update() puts the old root back into the node pool, count
+            # the tree while it is still there
+            self._node_depth = self.get_node_depth(self.parent)
+            self.parent = None
         self.update(move)
+        self.time_control.used(toplay, time.time() - start)
         return move
     
     def get_node_depth(self, root):
-        MAX_DEPTH = 100
-        nodesAtDepth = [0] * MAX_DEPTH
-        count_at_depth(root, 0, nodesAtDepth)
-        prev_nodes = 1
-        return nodesAtDepth
+        return node_depth(root)
     
+    def last_node_depth(self):
+        """
+        Nodes at each depth of the tree of the last search, None before
+        the first search. Root-parallel search sums the trees of its
+        workers.
+        """
+        if self.root_workers > 1:
+            if self.root_parallel is None:
+                return None
+            return self.root_parallel.node_depth
+        if self.parent is not None:
+            return self.get_node_depth(self.parent)
+        return self._node_depth
+
+    def last_search(self):
+        """
+        The search whose playout counters describe the last move, the
+        RootParallelMCTS in root-parallel mode and MCTS otherwise.
+        """
+        if self.root_workers > 1 and self.root_parallel is not None:
+            return self.root_parallel
+        return self.MCTS
+
     def get_properties(self):
         return dict(
             version=self.version,
@@ -108,7 +278,11 @@ def run():
     """
     start the gtp connection and wait for commands.
     """
-    board = SimpleGoBoard(7)
+    if board_type == 'bit':
+        board = BitGoBoard(7)
+    else:
+        board = SimpleGoBoard(7)
+    move_prob_cache.resize(prior_cache)
     con = GtpConnection2(Go5Player(num_simulation), board)
     con.start_connection()
 
@@ -117,5 +291,49 @@ if __name__=='__main__':
         sys.stderr.write('simulations must be random or rulebased or probabilistic \n')
         sys.stderr.flush()
         sys.exit(0)
+    if playout_mode != "copy" and playout_mode != "undo":
+        sys.stderr.write('playout must be copy or undo \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if board_type != "array" and board_type != "bit":
+        sys.stderr.write('board must be array or bit \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if tree_type != "node" and tree_type != "array":
+        sys.stderr.write('tree must be node or array \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if workers < 1 or root_workers < 1 or leaf_rollouts < 1:
+        sys.stderr.write('workers, root_workers and leaf_rollouts must be at least 1 \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if (workers > 1) + (root_workers > 1) + (leaf_rollouts > 1) > 1:
+        sys.stderr.write('use only one of workers, root_workers and leaf_rollouts \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if expand_threshold < 0:
+        sys.stderr.write('expand_threshold must be at least 0 \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if widen_k < 0 or widen_rate <= 1:
+        sys.stderr.write('widen_k must be at least 0 and widen_rate more than 1 \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if move_time < 0:
+        sys.stderr.write('move_time must be at least 0 \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if node_budget < 0 or (node_budget > 0 and (tree_type != "node" or tt_size > 0)):
+        sys.stderr.write('node_budget must be 0, or positive with the node tree and no tt_size \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if prior_cache < 0:
+        sys.stderr.write('prior_cache must be at least 0 \n')
+        sys.stderr.flush()
+        sys.exit(0)
+    if tt_size < 0 or (tt_size > 0 and tree_type != "node"):
+        sys.stderr.write('tt_size must be 0, or positive with the node tree \n')
+        sys.stderr.flush()
+        sys.exit(0)
     run()
 
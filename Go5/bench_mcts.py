@@ -0,0 +1,612 @@
+#!/usr/bin/python3
+"""
+Benchmarks for the Go5 MCTS player.
+
+Usage:
+    python3 bench_mcts.py playout_mode --sizes 7 9 --num_sim 200
+    python3 bench_mcts.py memory --sizes 7 9 --num_sim 200 --tree array
+    python3 bench_mcts.py tree --sizes 7 9 --num_sim 200
+    python3 bench_mcts.py select --sizes 7 9 --num_sim 2500 --num 2000
+    python3 bench_mcts.py backup --sizes 7 9 --num_sim 2500 --num 20000
+    python3 bench_mcts.py transposition --num_sim 1000 --tt_size 100000
+    python3 bench_mcts.py tt_check --sizes 2 3 5 --num_sim 2000 --searches 20
+    python3 bench_mcts.py parallel --sizes 7 9 --num_sim 400 --workers 1 2 4 8 16
+    python3 bench_mcts.py root_parallel --sizes 7 9 --num_sim 400 --workers 2 4 8
+    python3 bench_mcts.py leaf_parallel --sizes 7 9 --num_sim 100 --workers 1 2 4 8
+    python3 bench_mcts.py timed --sizes 7 9 --move_time 0.5 1 2
+    python3 bench_mcts.py early_stop --num_sim 1000 --gtp 3x3Test
+    python3 bench_mcts.py budget --sizes 7 --num_sim 20000 --node_budget 0 5000
+    python3 bench_mcts.py expand --sizes 7 9 --num_sim 1000 --expand_threshold 0 2 5 10
+    python3 bench_mcts.py widen --sizes 7 9 --num_sim 1000 --widen_k 0 5 10
+    python3 bench_mcts.py prior_cache --sizes 7 9 --num_sim 300 --prior_cache 0 10000
+
+tree runs the same seeded search on the TreeNode and the ArrayTree backend
+and checks that both end with the same root statistics. tt_check runs many
+seeded searches of a small board with the transposition table, where
+nodes are shared between parents with different numbers of children, and
+fails on the first error. prior_cache checks
+that the moves played do not depend on the cache capacity.
+"""
+import os, sys
+utilpath = sys.path[0] + "/../util/"
+sys.path.append(utilpath)
+utilpath = sys.path[0] + "/../Go4/"
+sys.path.append(utilpath)
+import time
+import random
+import argparse
+import tracemalloc
+import pickle
+import numpy as np
+from board_util_go4 import GoBoardUtilGo4, BLACK, WHITE
+from simple_board import SimpleGoBoard
+from mcts import MCTS, RootParallelMCTS, TreeNode, PASS, uct_val
+import feature # load the feature weights before measuring
+from feature import move_prob_cache
+
+def search(board, args, tree='node', tt_size=0, node_budget=0, **kwargs):
+    """
+    Run one MCTS.get_move on board and return (mcts, seconds). Early
+    stop is off unless asked for, so every search runs args.num_sim
+    playouts.
+    """
+    mcts = MCTS(tree, tt_size, node_budget)
+    start = time.time()
+    mcts.get_move(board,
+            board.current_player,
+            komi=args.komi,
+            limit=args.limit,
+            check_selfatari=False,
+            use_pattern=True,
+            num_simulation=args.num_sim,
+            exploration=0.4,
+            simulation_policy=args.simulations,
+            in_tree_knowledge='None',
+            **kwargs)
+    return mcts, time.time() - start
+
+def run_playout_mode(args):
+    for size in args.sizes:
+        for mode in ['copy', 'undo']:
+            np.random.seed(args.seed)
+            _, elapsed = search(SimpleGoBoard(size), args, playout_mode=mode)
+            print("{0}x{0} {1}: {2:.1f} playouts/sec".format(size, mode, args.num_sim / elapsed))
+
+def count_nodes(node):
+    count = 1
+    for _, child in node.children():
+        count += count_nodes(child)
+    return count
+
+def midgame_board(size):
+    board = SimpleGoBoard(size)
+    color = BLACK
+    for _ in range(size*size//2):
+        move = GoBoardUtilGo4.generate_random_move(board, color, True)
+        board.move(move, color)
+        color = GoBoardUtilGo4.opponent(color)
+    return board
+
+def run_memory(args):
+    """
+    Report the bytes allocated per tree node after a search and per board
+    copy, measured with tracemalloc.
+    """
+    for size in args.sizes:
+        np.random.seed(args.seed)
+        random.seed(args.seed)
+        board = SimpleGoBoard(size)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        mcts, _ = search(board, args, args.tree)
+        tree_bytes = tracemalloc.get_traced_memory()[0] - before
+        nodes = count_nodes(mcts._root)
+        board = midgame_board(size)
+        before = tracemalloc.get_traced_memory()[0]
+        copies = [board.copy() for _ in range(100)]
+        copy_bytes = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print("{0}x{0}: {1} nodes, {2:.0f} bytes/node, {3:.0f} bytes/board copy".format(
+              size, nodes, tree_bytes / nodes, copy_bytes / len(copies)))
+
+def root_stats(mcts):
+    return sorted((str(move), float(node._n_visits), float(node._black_wins))
+                  for move, node in mcts._root.children())
+
+def run_tree(args):
+    for size in args.sizes:
+        stats = []
+        for tree in ['node', 'array']:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, elapsed = search(SimpleGoBoard(size), args, tree)
+            stats.append(root_stats(mcts))
+            print("{0}x{0} {1}: {2:.1f} playouts/sec".format(size, tree, args.num_sim / elapsed))
+        assert stats[0] == stats[1], "tree backends disagree"
+
+def scalar_select(node, exploration, max_flag):
+    """
+    The selection TreeNode used before select_uct: a Python max over
+    uct_val, one child at a time.
+    """
+    return max(node.children(), key=lambda items:uct_val(node, items[1], exploration, max_flag))
+
+def vector_select(node, exploration, max_flag):
+    return node.select(exploration, max_flag)
+
+def descend(root, select, exploration):
+    """
+    Follow the selection policy from root to a leaf, return the moves.
+    """
+    node = root
+    color = BLACK
+    path = []
+    while not node.is_leaf():
+        move, node = select(node, exploration, color == BLACK)
+        path.append(move)
+        color = GoBoardUtilGo4.opponent(color)
+    return path
+
+def run_select(args):
+    """
+    Time the selection phase alone, root to leaf, on a warm tree.
+    """
+    exploration = 0.4
+    for size in args.sizes:
+        for tree in ['node', 'array']:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, _ = search(SimpleGoBoard(size), args, tree)
+            root = mcts._root
+            methods = [('vectorized', vector_select)]
+            if tree == 'node':
+                methods.insert(0, ('scalar', scalar_select))
+                assert descend(root, scalar_select, exploration) == descend(root, vector_select, exploration)
+            for name, select in methods:
+                start = time.time()
+                for _ in range(args.num):
+                    path = descend(root, select, exploration)
+                usec = 1e6 * (time.time() - start) / args.num
+                print("{0}x{0} {1} tree of {2} nodes, {3}: {4:.1f}us per playout, depth {5}".format(
+                      size, tree, count_nodes(root), name, usec, len(path)))
+
+def node_update(node, leaf_value):
+    """
+    Add one visit and leaf_value black wins to a TreeNode and to its edge
+    in the parent.
+    """
+    node._black_wins += leaf_value
+    node._n_visits += 1
+    parent = node._parent
+    if parent is not None:
+        parent._child_visits[node._index] += 1
+        parent._child_wins[node._index] += leaf_value
+
+def recursive_update(node, leaf_value):
+    """
+    The backprop TreeNode used before update_path: recurse to the root,
+    then update on the way back.
+    """
+    if node._parent:
+        recursive_update(node._parent, leaf_value)
+    node_update(node, leaf_value)
+
+def parent_walk_update(node, leaf_value):
+    """
+    Backprop from a leaf without the playout path: walk the parents up to
+    the root, then update_path on the nodes found.
+    """
+    path = []
+    while node is not None:
+        path.append(node)
+        node = node._parent
+    path.reverse()
+    TreeNode.update_path(path, leaf_value)
+
+def array_backup(leaf, leaf_value):
+    """
+    parent_walk_update on an ArrayTree, following the parent array.
+    """
+    tree = leaf._tree
+    node = leaf._index
+    while node >= 0:
+        tree.visits[node] += 1
+        tree.black_wins[node] += leaf_value
+        node = tree.parent[node]
+
+def leaf_path(root, exploration):
+    """
+    The nodes on the selection path from root to a leaf.
+    """
+    path = [root]
+    color = BLACK
+    while not path[-1].is_leaf():
+        _, node = path[-1].select(exploration, color == BLACK)
+        path.append(node)
+        color = GoBoardUtilGo4.opponent(color)
+    return path
+
+def run_backup(args):
+    """
+    Time backpropagation along the selection path of a warm tree.
+    """
+    for size in args.sizes:
+        for tree in ['node', 'array']:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, _ = search(SimpleGoBoard(size), args, tree)
+            path = leaf_path(mcts._root, 0.4)
+            leaf = path[-1]
+            methods = [('update_path', lambda: leaf.update_path(path, 1))]
+            if tree == 'node':
+                methods.insert(0, ('recursive', lambda: recursive_update(leaf, 1)))
+                methods.insert(1, ('parent walk', lambda: parent_walk_update(leaf, 1)))
+            else:
+                methods.insert(0, ('parent walk', lambda: array_backup(leaf, 1)))
+            for name, backup in methods:
+                start = time.time()
+                for _ in range(args.num):
+                    backup()
+                usec = 1e6 * (time.time() - start) / args.num
+                print("{0}x{0} {1} tree, path of {2} nodes, {3}: {4:.2f}us".format(
+                      size, tree, len(path), name, usec))
+
+def unique_nodes(root):
+    """
+    Number of distinct nodes below root, transpositions counted once.
+    """
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.extend(child for _, child in node.children())
+    return len(seen)
+
+def gtp_positions(filename):
+    """
+    The positions at which a GTP regression file asks for a move, as
+    (board size, [(color, point), ...]) pairs.
+    """
+    positions = []
+    size = 7
+    moves = []
+    for line in open(filename):
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            continue
+        if words[0].isdigit():
+            words = words[1:]
+        if words[0] == 'boardsize':
+            size = int(words[1])
+            moves = []
+        elif words[0] == 'clear_board':
+            moves = []
+        elif words[0] == 'play':
+            moves.append((GoBoardUtilGo4.color_to_int(words[1].lower()), words[2]))
+        elif words[0] in ['genmove', 'prior_knowledge']:
+            if (size, moves) not in positions:
+                positions.append((size, list(moves)))
+    return positions
+
+def position_board(size, moves):
+    board = SimpleGoBoard(size)
+    for color, move in moves:
+        row, col = GoBoardUtilGo4.move_to_coord(move, size)
+        board.move(board._coord_to_point(row, col), color)
+    return board
+
+def run_transposition(args):
+    """
+    Nodes and memory per search with and without the transposition table
+    on the positions of a GTP file.
+    """
+    for size, moves in gtp_positions(args.gtp):
+        for tt_size in [0, args.tt_size]:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            board = position_board(size, moves)
+            tracemalloc.start()
+            mcts, elapsed = search(board, args, tt_size=tt_size)
+            tree_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            nodes = unique_nodes(mcts._root)
+            print("{0}x{0} after {1} moves, tt_size {2}: {3} nodes, {4:.1f} nodes/playout, "
+                  "{5:.0f} KB, {6:.1f} playouts/sec".format(size, len(moves), tt_size, nodes,
+                  nodes / args.num_sim, tree_bytes / 1024, args.num_sim / elapsed))
+
+def passing_board(size, pass_prob=0.3):
+    """
+    A board after a random number of random moves, each one a pass with
+    probability pass_prob, so the position repeats earlier ones.
+    """
+    board = SimpleGoBoard(size)
+    color = BLACK
+    for _ in range(random.randint(0, size*size)):
+        move = None
+        if random.random() >= pass_prob:
+            move = GoBoardUtilGo4.generate_random_move(board, color, True)
+        board.move(move, color)
+        color = GoBoardUtilGo4.opponent(color)
+    return board
+
+def run_tt_check(args):
+    """
+    args.searches seeded searches per board size with the transposition
+    table: from the empty board, plain and with widening and an expansion
+    threshold, which change the number of children of the parents of
+    shared nodes, and from random positions with many passes, where
+    pass-pass gives back the key of an earlier position. Every search
+    must run all its playouts and return.
+    """
+    for size in args.sizes:
+        for start, kwargs in [('empty', {}), ('empty', dict(widen_k=2, expand_threshold=2)),
+                              ('passes', {})]:
+            for seed in range(args.searches):
+                np.random.seed(seed)
+                random.seed(seed)
+                board = SimpleGoBoard(size) if start == 'empty' else passing_board(size)
+                mcts, _ = search(board, args, tt_size=args.tt_size, **kwargs)
+                assert mcts.playouts == args.num_sim
+            print("{0}x{0} tt_size {1} from {2} {3}: {4} searches passed".format(
+                  size, args.tt_size, start, kwargs or 'plain', args.searches))
+
+def run_parallel(args):
+    """
+    Playouts/sec of tree-parallel search for each worker count, over three
+    consecutive moves on one persistent pool. Only the first move pays for
+    starting the workers.
+    """
+    for size in args.sizes:
+        for workers in args.workers:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts = MCTS()
+            board = SimpleGoBoard(size)
+            rates = []
+            for _ in range(3):
+                move_start = time.time()
+                move = mcts.get_move(board,
+                        board.current_player,
+                        komi=args.komi,
+                        limit=args.limit,
+                        check_selfatari=False,
+                        use_pattern=True,
+                        num_simulation=args.num_sim,
+                        exploration=0.4,
+                        simulation_policy=args.simulations,
+                        in_tree_knowledge='None',
+                        workers=workers,
+                        early_stop=False)
+                rates.append(args.num_sim / (time.time() - move_start))
+                board.move(move, board.current_player)
+                mcts.update_with_move(move)
+            mcts.close()
+            print("{0}x{0} {1} workers: {2} playouts/sec per move".format(
+                  size, workers, ", ".join("{:.1f}".format(r) for r in rates)))
+
+def run_root_parallel(args):
+    """
+    Playouts/sec of root-parallel search over three consecutive moves on
+    one persistent pool. Only the first move pays for starting the workers.
+    """
+    for size in args.sizes:
+        for workers in args.workers:
+            start = time.time()
+            mcts = RootParallelMCTS(workers, seed=args.seed)
+            board = SimpleGoBoard(size)
+            rates = []
+            for _ in range(3):
+                move_start = time.time()
+                move = mcts.get_move(board,
+                        board.current_player,
+                        komi=args.komi,
+                        limit=args.limit,
+                        check_selfatari=False,
+                        use_pattern=True,
+                        num_simulation=args.num_sim,
+                        exploration=0.4,
+                        simulation_policy=args.simulations,
+                        in_tree_knowledge='None')
+                rates.append(args.num_sim / (time.time() - move_start))
+                board.move(move, board.current_player)
+                mcts.update_with_move(move)
+            mcts.close()
+            print("{0}x{0} {1} root workers: {2} playouts/sec per move, {3:.1f}s total".format(
+                  size, workers, ", ".join("{:.1f}".format(r) for r in rates), time.time() - start))
+
+def run_leaf_parallel(args):
+    """
+    Rollouts/sec and leaves/sec of leaf-parallel search, each of the
+    num_sim leaves runs one rollout per worker. Also the size of the board
+    sent to the workers, as to_bytes() and as a pickle.
+    """
+    for size in args.sizes:
+        board = midgame_board(size)
+        print("{0}x{0} board: {1} bytes, pickled {2} bytes".format(
+              size, len(board.to_bytes()), len(pickle.dumps(board))))
+        for workers in args.workers:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, elapsed = search(SimpleGoBoard(size), args, leaf_rollouts=workers)
+            mcts.close()
+            print("{0}x{0} {1} leaf rollouts: {2:.1f} rollouts/sec, {3:.1f} leaves/sec".format(
+                  size, workers, args.num_sim * workers / elapsed, args.num_sim / elapsed))
+
+def run_timed(args):
+    """
+    Searches with a deadline and twice that as max_deadline: the time
+    they take past the deadline and the playouts they run.
+    """
+    for size in args.sizes:
+        for move_time in args.move_time:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            args.num_sim = sys.maxsize
+            start = time.time()
+            mcts, elapsed = search(midgame_board(size), args,
+                                   deadline=start + move_time,
+                                   max_deadline=start + 2 * move_time)
+            print("{0}x{0} {1}s per move: searched {2:.3f}s, {3} playouts".format(
+                  size, move_time, elapsed, int(mcts._root._n_visits)))
+
+def run_early_stop(args):
+    """
+    Searches with and without early stop on the positions of a GTP file:
+    the move, the playouts run and saved, and the time.
+    """
+    for size, moves in gtp_positions(args.gtp):
+        for early_stop in [False, True]:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            board = position_board(size, moves)
+            mcts, elapsed = search(board, args, early_stop=early_stop)
+            move, _ = max(mcts._root.children(), key=lambda c: c[1]._n_visits)
+            print("{0}x{0} after {1} moves, early stop {2}: move {3}, {4} playouts, "
+                  "{5} saved, {6:.3f}s".format(size, len(moves), early_stop,
+                  board.point_to_string(None if move == PASS else move), mcts.playouts, mcts.saved_playouts, elapsed))
+
+def run_budget(args):
+    """
+    Peak traced memory, final tree size and playouts/sec of a long search
+    for each node budget, 0 for no budget.
+    """
+    for size in args.sizes:
+        for node_budget in args.node_budget:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            tracemalloc.start()
+            mcts, elapsed = search(SimpleGoBoard(size), args, node_budget=node_budget)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("{0}x{0} node budget {1}: {2} nodes, peak {3:.0f} KB, {4:.1f} playouts/sec".format(
+                  size, node_budget, unique_nodes(mcts._root), peak / 1024, args.num_sim / elapsed))
+
+def run_expand(args):
+    """
+    Playouts/sec and tree nodes of a search for each expansion threshold.
+    """
+    for size in args.sizes:
+        for threshold in args.expand_threshold:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, elapsed = search(SimpleGoBoard(size), args, args.tree, expand_threshold=threshold)
+            move, _ = max(mcts._root.children(), key=lambda c: c[1]._n_visits)
+            print("{0}x{0} expand threshold {1}: {2:.1f} playouts/sec, {3} nodes, move {4}".format(
+                  size, threshold, args.num_sim / elapsed, unique_nodes(mcts._root), move))
+
+def run_widen(args):
+    """
+    Playouts/sec, tree nodes and traced tree memory of a search for each
+    progressive widening start width, 0 for no widening.
+    """
+    for size in args.sizes:
+        for widen_k in args.widen_k:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            tracemalloc.start()
+            mcts, _ = search(SimpleGoBoard(size), args, args.tree, widen_k=widen_k,
+                             widen_rate=args.widen_rate)
+            tree_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            mcts, elapsed = search(SimpleGoBoard(size), args, args.tree, widen_k=widen_k,
+                                   widen_rate=args.widen_rate)
+            move, _ = max(mcts._root.children(), key=lambda c: c[1]._n_visits)
+            print("{0}x{0} widen_k {1}: {2:.1f} playouts/sec, {3} nodes, {4:.0f} KB, move {5}".format(
+                  size, widen_k, args.num_sim / elapsed, unique_nodes(mcts._root),
+                  tree_bytes / 1024, move))
+
+def run_prior_cache(args):
+    """
+    Self-play of args.game_moves moves with a new tree for every move, for
+    each prior cache capacity, 0 for no cache: the time, the cache hits
+    and misses, and the moves, which must not change with the capacity.
+    """
+    for size in args.sizes:
+        games = []
+        for capacity in args.prior_cache:
+            np.random.seed(args.seed)
+            random.seed(args.seed)
+            move_prob_cache.resize(capacity)
+            move_prob_cache.clear()
+            move_prob_cache.hits = move_prob_cache.misses = 0
+            board = SimpleGoBoard(size)
+            moves = []
+            elapsed = 0.0
+            for _ in range(args.game_moves):
+                mcts, seconds = search(board, args)
+                elapsed += seconds
+                move, _ = max(mcts._root.children(), key=lambda c: c[1]._n_visits)
+                move = None if move == PASS else move
+                moves.append(move)
+                board.move(move, board.current_player)
+            games.append(moves)
+            print("{0}x{0} prior cache {1}: {2:.1f} playouts/sec, {3} hits, {4} misses, "
+                  "hit rate {5:.1%}".format(size, capacity,
+                  args.num_sim * args.game_moves / elapsed, move_prob_cache.hits,
+                  move_prob_cache.misses, move_prob_cache.hit_rate()))
+        assert all(moves == games[0] for moves in games)
+        print("{0}x{0}: {1} moves agree".format(size, args.game_moves))
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('bench', type=str, choices=['playout_mode', 'memory', 'tree', 'select', 'backup', 'transposition', 'tt_check', 'parallel', 'root_parallel', 'leaf_parallel', 'timed', 'early_stop', 'budget', 'expand', 'widen', 'prior_cache'], help='benchmark to run')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[7, 9], help='board sizes to benchmark')
+    parser.add_argument('--num_sim', type=int, default=200, help='number of playouts per search')
+    parser.add_argument('--num', type=int, default=2000, help='number of timed descents or backups for select and backup')
+    parser.add_argument('--limit', type=int, default=100, help='maximum number of moves per rollout')
+    parser.add_argument('--simulations', type=str, default='random', help='simulation policy: random or rulebased or probabilistic')
+    parser.add_argument('--komi', type=float, default=6.5, help='komi used for scoring')
+    parser.add_argument('--tree', type=str, choices=['node', 'array'], default='node', help='tree backend for memory, expand and widen')
+    parser.add_argument('--tt_size', type=int, default=100000, help='transposition table size for transposition and tt_check')
+    parser.add_argument('--searches', type=int, default=12, help='number of seeded searches per board size for tt_check')
+    parser.add_argument('--gtp', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'a4-sample.gtp'), help='GTP file with the positions for transposition and early_stop')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='worker counts for parallel, root_parallel and leaf_parallel')
+    parser.add_argument('--move_time', type=float, nargs='+', default=[0.5, 1, 2], help='seconds per move for timed')
+    parser.add_argument('--node_budget', type=int, nargs='+', default=[0, 5000], help='node budgets for budget, 0 for none')
+    parser.add_argument('--expand_threshold', type=int, nargs='+', default=[0, 2, 5, 10], help='expansion thresholds for expand')
+    parser.add_argument('--widen_k', type=int, nargs='+', default=[0, 5, 10], help='progressive widening start widths for widen')
+    parser.add_argument('--widen_rate', type=float, default=2.0, help='progressive widening rate for widen')
+    parser.add_argument('--prior_cache', type=int, nargs='+', default=[0, move_prob_cache.capacity], help='prior cache capacities for prior_cache, 0 for none')
+    parser.add_argument('--game_moves', type=int, default=10, help='self-play moves per game for prior_cache')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+    if args.bench == 'playout_mode':
+        run_playout_mode(args)
+    elif args.bench == 'memory':
+        run_memory(args)
+    elif args.bench == 'tree':
+        run_tree(args)
+    elif args.bench == 'select':
+        run_select(args)
+    elif args.bench == 'backup':
+        run_backup(args)
+    elif args.bench == 'transposition':
+        run_transposition(args)
+    elif args.bench == 'tt_check':
+        run_tt_check(args)
+    elif args.bench == 'parallel':
+        run_parallel(args)
+    elif args.bench == 'root_parallel':
+        run_root_parallel(args)
+    elif args.bench == 'leaf_parallel':
+        run_leaf_parallel(args)
+    elif args.bench == 'timed':
+        run_timed(args)
+    elif args.bench == 'early_stop':
+        run_early_stop(args)
+    elif args.bench == 'budget':
+        run_budget(args)
+    elif args.bench == 'expand':
+        run_expand(args)
+    elif args.bench == 'widen':
+        run_widen(args)
+    elif args.bench == 'prior_cache':
+        run_prior_cache(args)
+
+if __name__=='__main__':
+    main()
@@ -30,8 +30,111 @@ class GtpConnection2(gtp_connection.GtpConnection):
         """
         gtp_connection.GtpConnection.__init__(self, go_engine, board, outfile, debug_mode)
         self.commands["prior_knowledge"] = self.prior_knowledge_cmd
+        self.commands["workers"] = self.workers_cmd
+        self.argmap["workers"] = (1, 'Usage: workers INT')
+        self.commands["time_settings"] = self.time_settings_cmd
+        self.argmap["time_settings"] = (3, 'Usage: time_settings MAIN_TIME BYO_YOMI_TIME BYO_YOMI_STONES')
+        self.commands["time_left"] = self.time_left_cmd
+        self.argmap["time_left"] = (3, 'Usage: time_left {w,b} TIME STONES')
+        self.commands["move_time"] = self.move_time_cmd
+        self.argmap["move_time"] = (1, 'Usage: move_time FLOAT')
     
 
+    def start_connection(self):
+        """
+        Same as GtpConnection.start_connection, but the engine ponders
+        while this waits for the next command and stops before running it.
+        """
+        self.debug_msg("Start up successful...\n\n")
+        while True:
+            self.go_engine.start_pondering(self.board)
+            line = sys.stdin.readline()
+            self.go_engine.stop_pondering()
+            if not line:
+                break
+            self.get_cmd(line)
+
+    def workers_cmd(self, args):
+        """
+        Set the number of rollout worker processes used by MCTS, only
+        one of workers, root_workers and leaf_rollouts can be above 1
+        """
+        try:
+            workers = int(args[0])
+        except ValueError:
+            self.error('workers must be an integer')
+            return
+        if workers < 1:
+            self.error('workers must be at least 1')
+            return
+        if workers > 1 and (self.go_engine.root_workers > 1 or self.go_engine.leaf_rollouts > 1):
+            self.error('use only one of workers, root_workers and leaf_rollouts')
+            return
+        self.go_engine.workers = workers
+        self.respond()
+
+    def time_settings_cmd(self, args):
+        """
+        Set the time control of the game, Canadian byo-yomi
+
+        Arguments
+        ---------
+        args[0] : int
+            main time in seconds
+        args[1] : int
+            byo-yomi time in seconds
+        args[2] : int
+            stones to play in each byo-yomi period
+        """
+        try:
+            main_time, byo_yomi_time, byo_yomi_stones = [int(a) for a in args]
+        except ValueError:
+            self.error('time_settings arguments must be integers')
+            return
+        if main_time < 0 or byo_yomi_time < 0 or byo_yomi_stones < 0:
+            self.error('time_settings arguments must be at least 0')
+            return
+        self.go_engine.time_control.set_time_settings(main_time, byo_yomi_time, byo_yomi_stones)
+        self.respond()
+
+    def time_left_cmd(self, args):
+        """
+        Set the time left on the clock of a player
+
+        Arguments
+        ---------
+        args[0] : {'b','w'}
+            the color of the player
+        args[1] : int
+            seconds left
+        args[2] : int
+            stones left to play in the byo-yomi period, 0 in main time
+        """
+        try:
+            color = GoBoardUtilGo4.color_to_int(args[0].lower())
+            time_left = int(args[1])
+            stones_left = int(args[2])
+        except ValueError:
+            self.error('Usage: time_left {w,b} TIME STONES')
+            return
+        self.go_engine.time_control.set_time_left(color, time_left, stones_left)
+        self.respond()
+
+    def move_time_cmd(self, args):
+        """
+        Set the seconds per move, 0 to play num_total_sim simulations per move
+        """
+        try:
+            move_time = float(args[0])
+        except ValueError:
+            self.error('move_time must be a number')
+            return
+        if move_time < 0:
+            self.error('move_time must be at least 0')
+            return
+        self.go_engine.time_control.move_time = move_time
+        self.respond()
+
     def prior_knowledge_cmd(self, args):
         """
         Return list of policy moves for the current_player of the board
@@ -41,8 +144,9 @@ class GtpConnection2(gtp_connection.GtpConnection):
                                                         self.go_engine.check_selfatari)
 
         #policy_list.append("Pass")
-        self.MCTS = MCTS()
+        self.MCTS = MCTS(self.go_engine.tree_type, self.go_engine.tt_size, self.go_engine.node_budget)
         move_set =self.get_move(self.board,self.MCTS.toplay)
+        self.MCTS.close()
         #lst=self.MCTS.prior_knowledge_stat(self.board, self.MCTS._root, self.MCTS.toplay)
         move_string = ""
         for m_set in move_set:
@@ -55,7 +159,7 @@ class GtpConnection2(gtp_connection.GtpConnection):
         s_color = GoBoardUtilGo4.int_to_color(color)
 
         stats=[]
-        for move,node in root._children.items():
+        for move,node in root.children():
             if color == BLACK:
                 wins = node._black_wins
             else:
@@ -87,6 +191,12 @@ class GtpConnection2(gtp_connection.GtpConnection):
                 num_simulation = self.go_engine.num_simulation,
                 exploration = self.go_engine.exploration,
                 simulation_policy = self.go_engine.simulation_policy,
-                in_tree_knowledge = self.go_engine.in_tree_knowledge)
+                in_tree_knowledge = self.go_engine.in_tree_knowledge,
+                playout_mode = self.go_engine.playout_mode,
+                workers = self.go_engine.workers,
+                leaf_rollouts = self.go_engine.leaf_rollouts,
+                expand_threshold = self.go_engine.expand_threshold,
+                widen_k = self.go_engine.widen_k,
+                widen_rate = self.go_engine.widen_rate)
         return move
 
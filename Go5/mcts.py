@@ -5,6 +5,9 @@ This function is loosely based on https://github.com/Rochester-NRT/RocAlphaGo/bl
 import os, sys
 import numpy as np
 import random
+import time
+import queue
+import multiprocessing
 from board_util_go4 import GoBoardUtilGo4, BLACK, WHITE
 PASS = 'pass'
 np.seterr(all='ignore') 
@@ -17,57 +20,164 @@ def uct_val(node, child, exploration, max_flag):
     else:
         return float(child._n_visits - child._black_wins)/child._n_visits + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
 
+def select_uct(visits, wins, parent_visits, exploration, max_flag):
+    """
+    Index of the child with the highest uct_val, computed for all children
+    in one vectorized operation over their visits and black wins. Gives the
+    same values and tie breaking as max() over uct_val.
+    """
+    if parent_visits == 0:
+        # uct_val is nan for all visited children, max keeps the first
+        return 0
+    if not max_flag:
+        wins = visits - wins
+    uct = wins/visits + exploration*np.sqrt(np.log(parent_visits)/visits)
+    uct[visits == 0] = 0
+    return int(np.argmax(uct))
+
+def widen_order(moves, prob, widen_k):
+    """
+    Split moves for progressive widening into the widen_k most probable,
+    best first, which get children at expansion, and the others, best
+    first, which are unlocked later. widen_k 0 keeps all moves in their
+    order.
+    """
+    if widen_k == 0 or len(moves) <= widen_k:
+        return moves, []
+    moves = sorted(moves, key=lambda move: -prob[move])
+    return moves[:widen_k], moves[widen_k:]
+
+def count_at_depth(node, depth, nodesAtDepth):
+    if not node._expanded:
+        return
+    nodesAtDepth[depth] += 1
+    for _,child in node.children():
+        count_at_depth(child, depth+1, nodesAtDepth)
+
+def node_depth(root, max_depth=100):
+    """
+    Number of expanded nodes at each depth of the tree under root.
+    """
+    nodesAtDepth = [0] * max_depth
+    count_at_depth(root, 0, nodesAtDepth)
+    return nodesAtDepth
+
 class TreeNode(object):
     """
     A node in the MCTS tree.
+    Children are kept in two parallel lists, _moves and _nodes, which are
+    only created when the node is expanded. The visits and black wins of
+    the children are mirrored in the arrays _child_visits and _child_wins
+    for select(), a node is at position _index among its siblings.
+    With progressive widening, _pending holds (move, visits, black wins)
+    of the moves that have no child yet, the most probable last.
     """
+    __slots__ = ('_parent', '_moves', '_nodes', '_n_visits', '_black_wins',
+                 '_expanded', '_move', '_index', '_child_visits', '_child_wins',
+                 '_pending')
     version = 0.22
     name = "MCTS Player"
-    def __init__(self, parent, n_visits = 0, black_wins = 0):
+    def __init__(self, parent, n_visits = 0, black_wins = 0, move = None, index = 0):
         """
         parent is set when a node gets expanded
         """
         self._parent = parent
-        self._children = {}  # a map from move to TreeNode
+        self._moves = None
+        self._nodes = None
+        self._child_visits = None
+        self._child_wins = None
+        self._pending = None
+        self._index = index
         self._n_visits = n_visits
         self._black_wins = black_wins
         self._expanded = False
-        self._move = None
+        self._move = move
 
-    def expand(self, board, color):
+    def expand(self, board, color, pool=None, widen_k=0):
         """
-        Expands tree by creating new children.
+        Expands tree by creating new children, taken from pool when given.
+        widen_k > 0 creates only the widen_k most probable move children
+        and PASS, see widen().
         """
+        new_node = TreeNode if pool is None else pool.node
         moves, prob =  generate_moves_with_feature_based_probs(board, color)
+        moves, later = widen_order(moves, prob, widen_k)
 
         max_prob = max(prob)
         # convert prob to simulation count and win for each move
-        sim = []
-        winrate = []
-        wins = []
+        child_moves = []
+        nodes = []
+        sims = []
+        child_wins = []
         for move in moves:
             # number of simulation per move
-            sim.append(10*prob[move]/max_prob)
+            sim = 10*prob[move]/max_prob
             
             # winrate with linear scaling forumla
-            winrate.append((0.5/max_prob)*prob[move] + 0.5)
-
-            wins.append(int(round(winrate[-1]*sim[-1])))
+            winrate = (0.5/max_prob)*prob[move] + 0.5
 
-            if move not in self._children:
-                self._children[move] = TreeNode(self, sim[-1], wins[-1])
-                self._children[move]._move = move
+            wins = int(round(winrate*sim))
+            child_moves.append(move)
+            nodes.append(new_node(self, sim, wins, move, len(nodes)))
+            sims.append(sim)
+            child_wins.append(wins)
 
-        self._children[PASS] = TreeNode(self)
-        self._children[PASS]._move = PASS
+        child_moves.append(PASS)
+        nodes.append(new_node(self, move=PASS, index=len(nodes)))
+        self._moves = child_moves
+        self._nodes = nodes
+        self._child_visits = np.array(sims + [0], dtype=np.float64)
+        self._child_wins = np.array(child_wins + [0], dtype=np.float64)
         self._expanded = True
+        if later:
+            self._pending = []
+            for move in reversed(later):
+                sim = 10*prob[move]/max_prob
+                winrate = (0.5/max_prob)*prob[move] + 0.5
+                self._pending.append((move, sim, int(round(winrate*sim))))
 
-        '''
-        print("moves  :", moves)
-        print("sims   :", sim)
-        print("winrate:", winrate)
-        print("wins   :", wins)
-        '''
+    def widen(self, num_moves, pool=None):
+        """
+        Unlock pending moves, most probable first, until num_moves moves
+        besides PASS have children.
+        """
+        new = []
+        while self._pending and len(self._nodes) + len(new) <= num_moves:
+            new.append(self._pending.pop())
+        if not new:
+            return
+        new_node = TreeNode if pool is None else pool.node
+        for move, sim, wins in new:
+            self._moves.append(move)
+            self._nodes.append(new_node(self, sim, wins, move, len(self._nodes)))
+        self._child_visits = np.append(self._child_visits, [sim for _, sim, _ in new])
+        self._child_wins = np.append(self._child_wins, [wins for _, _, wins in new])
+
+    def children(self):
+        """
+        List of (move, child) pairs.
+        """
+        if self._moves is None:
+            return []
+        return list(zip(self._moves, self._nodes))
+
+    def edges(self):
+        """
+        List of (move, visits, black wins) of the edges to the children,
+        the statistics select() uses. They differ from the totals of a
+        child shared with other parents through the transposition table.
+        """
+        if self._moves is None:
+            return []
+        return list(zip(self._moves, self._child_visits.tolist(), self._child_wins.tolist()))
+
+    def child(self, move):
+        """
+        The child reached by move, or None.
+        """
+        if self._moves is None or move not in self._moves:
+            return None
+        return self._nodes[self._moves.index(move)]
 
     def select(self, exploration, max_flag):
         """
@@ -78,47 +188,432 @@ class TreeNode(object):
         Returns:
         A tuple of (move, next_node)
         """
-        return max(self._children.items(), key=lambda items:uct_val(self, items[1], exploration, max_flag))
+        i = select_uct(self._child_visits, self._child_wins, self._n_visits, exploration, max_flag)
+        return self._moves[i], self._nodes[i]
            
         
-    def update(self, leaf_value):
+    @staticmethod
+    def update_path(path, leaf_value, num_rollouts=1):
         """
-        Update node values from leaf evaluation.
-        Arguments:
-        leaf_value -- the value of subtree evaluation from the current player's perspective.
-        
-        Returns:
-        None
+        Update every node on path, the nodes visited by a playout from the
+        root down, in one loop: one visit and leaf_value black wins on
+        each node and on its edge in the previous node on the path.
+        With num_rollouts > 1, leaf_value is the number of black wins in
+        that many rollouts from the leaf.
         """
-        self._black_wins += leaf_value
-        self._n_visits += 1
+        parent = path[0]._parent
+        for node in path:
+            node._black_wins += leaf_value
+            node._n_visits += num_rollouts
+            if parent is not None:
+                i = node._index
+                if i >= len(parent._nodes) or parent._nodes[i] is not node:
+                    # a transposition shared with another parent
+                    i = parent._nodes.index(node)
+                parent._child_visits[i] += num_rollouts
+                parent._child_wins[i] += leaf_value
+            parent = node
 
-    def update_recursive(self, leaf_value):
+    @staticmethod
+    def add_virtual_loss(path, toplay, sign):
         """
-        Like a call to update(), but applied recursively for all ancestors.
-
-        Note: it is important that this happens from the root downward so that 'parent' visit
-        counts are correct.
+        Add (sign 1) or take back (sign -1) a virtual loss on path: one
+        visit for every node, counted as a loss for the player who moved
+        into it. toplay is the color to play at the root.
         """
-        # If it is not root, this node's parent should be updated first.
-        if self._parent:
-            self._parent.update_recursive(leaf_value)
-        self.update(leaf_value)
+        parent = path[0]._parent
+        color = GoBoardUtilGo4.opponent(toplay)
+        for node in path:
+            # a loss for white is a black win
+            loss = sign if color == WHITE else 0
+            node._n_visits += sign
+            node._black_wins += loss
+            if parent is not None:
+                i = node._index
+                if i >= len(parent._nodes) or parent._nodes[i] is not node:
+                    i = parent._nodes.index(node)
+                parent._child_visits[i] += sign
+                parent._child_wins[i] += loss
+            parent = node
+            color = GoBoardUtilGo4.opponent(color)
 
 
     def is_leaf(self):
         """
         Check if leaf node (i.e. no nodes below this have been expanded).
         """
-        return self._children == {}
+        return self._moves is None
 
     def is_root(self):
         return self._parent is None
 
-class MCTS(object):
+class NodePool(object):
+    """
+    Free list of TreeNode objects for a tree with a node budget. The nodes
+    of pruned and dropped subtrees are put back here and handed out again
+    by later expansions, instead of being garbage collected and allocated
+    anew. live counts the nodes handed out and not yet put back.
+    """
     def __init__(self):
-        self._root = TreeNode(None)
+        self._free = []
+        self.live = 0
+
+    def node(self, parent, n_visits=0, black_wins=0, move=None, index=0):
+        """
+        A TreeNode with the given state, same arguments as TreeNode().
+        """
+        self.live += 1
+        if self._free:
+            node = self._free.pop()
+            node.__init__(parent, n_visits, black_wins, move, index)
+            return node
+        return TreeNode(parent, n_visits, black_wins, move, index)
+
+    def release_children(self, node):
+        """
+        Put back every node below node, which becomes a leaf again and
+        keeps its own statistics.
+        """
+        stack = list(node._nodes or ())
+        node.__init__(node._parent, node._n_visits, node._black_wins, node._move, node._index)
+        self._put_back(stack)
+
+    def release(self, node, keep=None):
+        """
+        Put back node and every node below it, except the subtree of keep.
+        """
+        self._put_back([node], keep)
+
+    def _put_back(self, stack, keep=None):
+        free = self._free
+        while stack:
+            node = stack.pop()
+            if node is keep:
+                continue
+            if node._nodes is not None:
+                stack.extend(node._nodes)
+            node.__init__(None)
+            free.append(node)
+            self.live -= 1
+
+class ArrayTree(object):
+    """
+    MCTS tree stored as a struct of arrays. Nodes are integer indices into
+    preallocated NumPy buffers, the children of a node occupy the index range
+    first_child[i] .. first_child[i]+num_children[i]. The buffers double in
+    size when they fill up. Index 0 is the root of a new tree.
+    Moves are stored as points, with PASS_POINT for a pass.
+    With progressive widening only the first active[i] children take part
+    in selection, the others are unlocked by widen().
+    """
+    PASS_POINT = -1
+
+    def __init__(self, capacity=1024):
+        self.visits = np.zeros(capacity)
+        self.black_wins = np.zeros(capacity, dtype=np.int64)
+        self.prior = np.zeros(capacity)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.move = np.full(capacity, self.PASS_POINT, dtype=np.int32)
+        self.size = 1
+
+    def _grow(self, needed):
+        capacity = len(self.visits)
+        while capacity < needed:
+            capacity *= 2
+        for name, fill in [('visits', 0), ('black_wins', 0), ('prior', 0),
+                           ('first_child', -1), ('num_children', 0), ('active', 0),
+                           ('parent', -1), ('move', self.PASS_POINT)]:
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add_children(self, node, moves, visits, black_wins, prior, active=None):
+        """
+        Append the children of node, given as arrays of moves and initial
+        statistics, at the end of the buffers. The first active of them
+        take part in selection, all of them by default.
+        """
+        num = len(moves)
+        first = self.size
+        if first + num > len(self.visits):
+            self._grow(first + num)
+        end = first + num
+        self.move[first:end] = moves
+        self.visits[first:end] = visits
+        self.black_wins[first:end] = black_wins
+        self.prior[first:end] = prior
+        self.parent[first:end] = node
+        self.first_child[node] = first
+        self.num_children[node] = num
+        self.active[node] = num if active is None else active
+        self.size = end
+
+    def widen(self, node, num_children):
+        """
+        Let the first num_children children of node take part in selection.
+        """
+        self.active[node] = min(max(num_children, self.active[node]), self.num_children[node])
+
+    def select(self, node, exploration, max_flag):
+        """
+        Index of the child of node with the highest UCT value, same values
+        and tie breaking as TreeNode.select.
+        """
+        first = self.first_child[node]
+        end = first + self.active[node]
+        return first + select_uct(self.visits[first:end], self.black_wins[first:end],
+                                  self.visits[node], exploration, max_flag)
+
+    def root(self):
+        return ArrayNode(self, 0)
+
+class ArrayNode(object):
+    """
+    Handle on a node of an ArrayTree with the interface of TreeNode, so that
+    MCTS and the GTP statistics work with either tree.
+    """
+    __slots__ = ('_tree', '_index')
+    VECTOR_BACKUP_MIN = 16
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def _n_visits(self):
+        return self._tree.visits[self._index]
+
+    @property
+    def _black_wins(self):
+        return self._tree.black_wins[self._index]
+
+    @property
+    def _expanded(self):
+        return self._tree.first_child[self._index] >= 0
+
+    @property
+    def _move(self):
+        move = int(self._tree.move[self._index])
+        return PASS if move == ArrayTree.PASS_POINT else move
+
+    @property
+    def _parent(self):
+        parent = self._tree.parent[self._index]
+        return None if parent < 0 else ArrayNode(self._tree, parent)
+
+    @_parent.setter
+    def _parent(self, parent):
+        assert parent is None
+        self._tree.parent[self._index] = -1
+
+    def expand(self, board, color, pool=None, widen_k=0):
+        """
+        Expands tree by creating new children, with the same initial
+        statistics and order as TreeNode.expand. There is no node pool for
+        an ArrayTree, pool must be None. With widen_k > 0 all children are
+        stored, the moves unlocked later after PASS, but only the first
+        widen_k and PASS are active.
+        """
+        moves, prob = generate_moves_with_feature_based_probs(board, color)
+        moves, later = widen_order(moves, prob, widen_k)
+        moves = moves + [ArrayTree.PASS_POINT] + later
+        points = [m for m in moves if m != ArrayTree.PASS_POINT]
+        max_prob = max(prob)
+        prior = np.zeros(len(moves))
+        sim = np.zeros(len(moves))
+        wins = np.zeros(len(moves))
+        if points:
+            index = [i for i, m in enumerate(moves) if m != ArrayTree.PASS_POINT]
+            prior[index] = prob[points]
+            sim[index] = 10*prob[points]/max_prob
+            winrate = (0.5/max_prob)*prob[points] + 0.5
+            wins[index] = np.round(winrate*sim[index])
+        self._tree.add_children(self._index, moves, sim, wins, prior,
+                                len(moves) - len(later))
+
+    def widen(self, num_moves, pool=None):
+        """
+        Same as TreeNode.widen.
+        """
+        self._tree.widen(self._index, num_moves + 1)
+
+    @property
+    def _pending(self):
+        tree = self._tree
+        return tree.active[self._index] < tree.num_children[self._index]
+
+    def children(self):
+        """
+        List of (move, child) pairs.
+        """
+        tree = self._tree
+        first = tree.first_child[self._index]
+        if first < 0:
+            return []
+        return [(ArrayNode(tree, i)._move, ArrayNode(tree, i))
+                for i in range(first, first + tree.active[self._index])]
+
+    def edges(self):
+        """
+        Same as TreeNode.edges, an ArrayTree has no shared nodes.
+        """
+        return [(move, float(node._n_visits), float(node._black_wins))
+                for move, node in self.children()]
+
+    def child(self, move):
+        """
+        The child reached by move, or None.
+        """
+        for m, node in self.children():
+            if m == move:
+                return node
+        return None
+
+    def select(self, exploration, max_flag):
+        child = ArrayNode(self._tree, self._tree.select(self._index, exploration, max_flag))
+        return child._move, child
+
+    @staticmethod
+    def update_path(path, leaf_value, num_rollouts=1):
+        """
+        Update every node on path. Long paths use one vectorized add per
+        buffer, the nodes of a path are distinct so fancy indexing adds
+        once to each. Below VECTOR_BACKUP_MIN nodes the indexing overhead
+        is larger than a plain loop.
+        """
+        tree = path[0]._tree
+        visits = tree.visits
+        black_wins = tree.black_wins
+        if len(path) < ArrayNode.VECTOR_BACKUP_MIN:
+            for node in path:
+                visits[node._index] += num_rollouts
+                black_wins[node._index] += leaf_value
+        else:
+            index = [node._index for node in path]
+            visits[index] += num_rollouts
+            black_wins[index] += leaf_value
+
+    @staticmethod
+    def add_virtual_loss(path, toplay, sign):
+        """
+        Same as TreeNode.add_virtual_loss on the ArrayTree buffers.
+        """
+        tree = path[0]._tree
+        color = GoBoardUtilGo4.opponent(toplay)
+        for node in path:
+            tree.visits[node._index] += sign
+            if color == WHITE:
+                tree.black_wins[node._index] += sign
+            color = GoBoardUtilGo4.opponent(color)
+
+    def is_leaf(self):
+        return self._tree.first_child[self._index] < 0
+
+    def is_root(self):
+        return self._tree.parent[self._index] < 0
+
+class TranspositionTable(object):
+    """
+    Bounded map from a position key to the TreeNode of that position,
+    which lets MCTS share one node between all move orders reaching it.
+    When the table grows past max_size the less visited half of its
+    entries is dropped. Dropped nodes stay in the tree, they are only no
+    longer shared with new transpositions.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, key):
+        return self._nodes.get(key)
+
+    def store(self, key, node):
+        self._nodes[key] = node
+        if len(self._nodes) > self.max_size:
+            keep = sorted(self._nodes.items(), key=lambda item: item[1]._n_visits,
+                          reverse=True)[:self.max_size//2]
+            self._nodes = dict(keep)
+
+    def clear(self):
+        self._nodes = {}
+
+class MCTS(object):
+    # a timed search keeps going past its deadline while the most visited
+    # root child has fewer than this many times the visits of the second
+    UNSETTLED_RATIO = 1.2
+
+    # pruning brings the tree down to this share of the node budget
+    PRUNE_TO = 0.75
+
+    def __init__(self, tree='node', tt_size=0, node_budget=0):
+        """
+        tree selects the tree backend: 'node' for TreeNode objects, 'array'
+        for the ArrayTree buffers.
+        tt_size > 0 turns the tree into a DAG: nodes below the root's
+        children are shared between transpositions through a table of at
+        most tt_size positions. Only the node backend supports this.
+        node_budget > 0 bounds the number of nodes in the tree, see
+        _prune. Only the node backend without a table supports this.
+        """
+        assert tt_size == 0 or tree == 'node'
+        assert node_budget == 0 or (tree == 'node' and tt_size == 0)
+        self.tree = tree
+        self._table = TranspositionTable(tt_size) if tt_size > 0 else None
+        self.node_budget = node_budget
+        self._pool = NodePool() if node_budget > 0 else None
+        self._root = None
+        self._root = self._new_root()
         self.toplay = BLACK
+        self.playout_mode = 'copy'
+        self.workers = 1
+        self.leaf_rollouts = 1
+        self._leaf_pool = None
+        self._leaf_pool_size = 0
+        # rollout pool of tree-parallel search, kept between searches
+        self._rollout_pool = None
+        self._rollout_pool_size = 0
+        # tells the rollout workers when the search root changes
+        self._search_id = 0
+        self.deadline = None
+        self.max_deadline = None
+        self.early_stop = False
+        self.expand_threshold = 0
+        self.widen_k = 0
+        self.widen_rate = 2.0
+        # threading.Event that ends a ponder search
+        self._stop = None
+        # playouts run by the last search, and playouts early stop saved
+        self.playouts = 0
+        self.saved_playouts = 0
+        # root visits carried over from earlier moves by the last get_move
+        self.reused_visits = 0
+        # playouts run by the last ponder search
+        self.ponder_playouts = 0
+        # snapshot of the search root and scratch board of the playouts,
+        # reused between searches
+        self._snapshot = None
+        self._scratch = None
+        # nodes visited by the current playout, reused between playouts
+        self._path = []
+
+    def _new_root(self):
+        if self._table is not None:
+            self._table.clear()
+        if self.tree == 'array':
+            return ArrayTree().root()
+        if self._pool is not None:
+            if self._root is not None:
+                self._pool.release(self._root)
+            return self._pool.node(None)
+        return TreeNode(None)
+
     def _playout(self, board, color):
         """
         Run a single playout from the root to the given depth, getting a value at the leaf and
@@ -133,13 +628,62 @@ class MCTS(object):
         Returns:
         None
         """
+        path, color = self._select_leaf(board, color)
+        if self.leaf_rollouts > 1:
+            leaf_value = self._evaluate_leaf_rollouts(board, color)
+            path[-1].update_path(path, leaf_value, self.leaf_rollouts)
+        else:
+            leaf_value = self._evaluate_rollout(board, color)  
+            # Update value and visit count of nodes in this traversal.
+            path[-1].update_path(path, leaf_value)
+        if self._pool is not None and self._pool.live > self.node_budget:
+            self._prune()
+
+    def _prune(self):
+        """
+        Collapse the least visited expanded nodes below the root, putting
+        the nodes under them back into the pool, until at most PRUNE_TO of
+        the node budget is in use. Collapsed nodes keep their statistics
+        and are expanded again when selection reaches them.
+        """
+        target = int(self.node_budget * self.PRUNE_TO)
+        expanded = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for child in node._nodes or ():
+                if child._nodes is not None:
+                    expanded.append(child)
+                    stack.append(child)
+        expanded.sort(key=lambda node: node._n_visits)
+        for node in expanded:
+            if self._pool.live <= target:
+                break
+            # skip nodes already put back with a collapsed ancestor
+            if node._nodes is not None:
+                self._pool.release_children(node)
+
+    def _select_leaf(self, board, color):
+        """
+        Selection and expansion phase of a playout: follow the tree policy
+        from the root, playing the moves on board, and expand the leaf.
+        Returns the path of visited nodes, in the reusable buffer
+        self._path, and the color to play at the leaf.
+        """
         node = self._root 
+        path = self._path
+        del path[:]
+        path.append(node)
+        # nodes on path, a shared node may be reached again in one descent
+        on_path = {id(node)} if self._table is not None else None
         # This will be True only once for the root
         if not node._expanded:
-            node.expand(board, color)
+            node.expand(board, color, self._pool, self.widen_k)
         while not node.is_leaf():
             # Greedily select next move.                
             max_flag = color == BLACK
+            if self.widen_k and node._pending:
+                node.widen(self._widen_size(node._n_visits), self._pool)
             move, next_node = node.select(self.exploration,max_flag)
             if move!=PASS:
                 assert board.check_legal(move, color)
@@ -147,15 +691,240 @@ class MCTS(object):
                 move = None
             board.move(move, color)
             color = GoBoardUtilGo4.opponent(color) 
+            if self._table is not None:
+                if not next_node._expanded and len(path) > 1:
+                    next_node = self._transpose(node, next_node, board)
+                if id(next_node) in on_path:
+                    # the descent came back to a node on the path, stop selecting
+                    break
+                on_path.add(id(next_node))
             node = next_node
-        assert node.is_leaf()
-        if not node._expanded:
-            node.expand(board, color)
+            path.append(node)
+        if (not node._expanded and node._n_visits >= self.expand_threshold
+                and (self._pool is None or self._pool.live < self.node_budget)):
+            # below expand_threshold visits the leaf only gets a rollout.
+            # Past the node budget, with no pruning while tree-parallel
+            # playouts are in flight, leaves stay unexpanded
+            node.expand(board, color, self._pool, self.widen_k)
 
         assert board.current_player == color
-        leaf_value = self._evaluate_rollout(board, color)  
-        # Update value and visit count of nodes in this traversal.
-        node.update_recursive(leaf_value)
+        return path, color
+
+    def _widen_size(self, n_visits):
+        """
+        Progressive widening schedule: the number of moves besides PASS
+        with a child at a node with n_visits visits. It starts at widen_k
+        and grows by one each time n_visits + 1 grows by widen_rate.
+        """
+        return self.widen_k + int(np.log(n_visits + 1) / np.log(self.widen_rate))
+
+    def _transpose(self, parent, child, board):
+        """
+        Look up the position on board, reached from parent through the
+        unexpanded child. If another node already holds it, relink that
+        node in place of child and return it. Otherwise record child for
+        the position and return it.
+
+        Positions are keyed by board.zobrist_key and the number of moves
+        played, passes included. A pass-pass or a ko sequence gives back
+        the Zobrist key of an earlier position, but never its move count,
+        so every edge goes one move deeper and the shared nodes can not
+        form a cycle.
+
+        Selection at a node uses the visits and wins of its own edges
+        (_child_visits, _child_wins) and the node's total visit count, so
+        UCT stays consistent when a node has several parents.
+        """
+        key = (board.zobrist_key, len(board.moves))
+        node = self._table.get(key)
+        if node is None:
+            self._table.store(key, child)
+            return child
+        if node is child:
+            return child
+        parent._nodes[parent._nodes.index(child)] = node
+        return node
+
+    def _run_playouts(self, board, toplay, num_simulation):
+        """
+        Run num_simulation playouts from board on one scratch board, or on
+        worker processes when self.workers > 1.
+        playout_mode 'copy' restores the scratch board from a snapshot before
+        every playout, 'undo' plays tree and rollout moves on the scratch
+        board and unwinds them with undo_move after backpropagation.
+        With self.early_stop the serial search ends as soon as the most
+        visited root child can no longer be overtaken, the playouts left
+        are counted in self.saved_playouts.
+        """
+        self.playouts = 0
+        self.saved_playouts = 0
+        if self.workers > 1:
+            self._run_parallel_playouts(board, toplay, num_simulation)
+            return
+        board_copy = self._scratch = board.snapshot(self._scratch)
+        if self.playout_mode == 'undo':
+            num_moves = len(board_copy.moves)
+        else:
+            snapshot = self._snapshot = board.snapshot(self._snapshot)
+        next_check = 0
+        for n in range(num_simulation):
+            if self._out_of_time():
+                break
+            if n == next_check:
+                next_check = self._next_lock_check(n, num_simulation)
+                if next_check is None:
+                    self.saved_playouts = num_simulation - n
+                    break
+            if self.playout_mode == 'undo':
+                self._playout(board_copy, toplay)
+                board_copy.undo_to(num_moves)
+            else:
+                board_copy.restore(snapshot)
+                self._playout(board_copy, toplay)
+            self.playouts += 1
+
+    def _root_visits(self):
+        """
+        Visit counts of the root children, most visited first.
+        """
+        return sorted((visits for _, visits, _ in self._root.edges()), reverse=True)
+
+    def _next_lock_check(self, done, num_simulation):
+        """
+        Early stop test after done of num_simulation playouts. Returns None
+        when the most visited root child leads the second by more visits
+        than the remaining playouts can add, so get_move's choice is
+        locked. Otherwise returns the first playout at which that can
+        become true: every playout adds leaf_rollouts visits to one child,
+        so the gap closes on the remaining visits by at most twice that.
+        """
+        if not self.early_stop:
+            return num_simulation
+        visits = self._root_visits()
+        if not visits:
+            # the root is expanded by the first playout
+            return done + 1
+        if len(visits) == 1:
+            return None
+        remaining = (num_simulation - done) * self.leaf_rollouts
+        gap = visits[0] - visits[1]
+        if gap > remaining:
+            return None
+        return done + int((remaining - gap) // (2 * self.leaf_rollouts)) + 1
+
+    def _out_of_time(self):
+        """
+        True when a timed search has to stop: past self.deadline, unless
+        the root is still unsettled and self.max_deadline is not reached.
+        Untimed searches, deadline None, never run out of time. A ponder
+        search stops when its stop event is set.
+        """
+        if self._stop is not None and self._stop.is_set():
+            return True
+        if self.deadline is None:
+            return False
+        now = time.time()
+        if now < self.deadline:
+            return False
+        if self.max_deadline is None or now >= self.max_deadline:
+            return True
+        return not self._root_unsettled()
+
+    def _root_unsettled(self):
+        """
+        True while the two most visited root children are within
+        UNSETTLED_RATIO visits of each other.
+        """
+        visits = self._root_visits()
+        return len(visits) > 1 and visits[0] < self.UNSETTLED_RATIO * visits[1]
+
+    def _run_parallel_playouts(self, board, toplay, num_simulation):
+        """
+        Tree-parallel search: this process selects and expands leaves and
+        self.workers worker processes run the rollouts. Every leaf in
+        flight has a virtual loss on its path, so the next descents pick
+        other lines. When a rollout comes back its virtual loss is taken
+        off and the result is backed up as in _playout. The worker pool
+        is started by the first search and kept for the later ones, every
+        task carries the search root as to_bytes() and the workers rebuild
+        their board when the root changes.
+        """
+        snapshot = self._snapshot = board.snapshot(self._snapshot)
+        board_copy = self._scratch = board.snapshot(self._scratch)
+        num_moves = len(board.moves)
+        results = queue.Queue()
+        pending = {}
+        started = 0
+        if self._rollout_pool is None or self._rollout_pool_size != self.workers:
+            self._close_rollout_pool()
+            self._rollout_pool = multiprocessing.Pool(self.workers, _seed_worker)
+            self._rollout_pool_size = self.workers
+        pool = self._rollout_pool
+        self._search_id += 1
+        root = (self._search_id, type(board), board.to_bytes(),
+                (self.komi, self.limit, self.simulation_policy,
+                 self.use_pattern, self.check_selfatari))
+        try:
+            while True:
+                while (started < num_simulation and len(pending) < self.workers
+                       and not self._out_of_time()):
+                    board_copy.restore(snapshot)
+                    path, _ = self._select_leaf(board_copy, toplay)
+                    path = list(path)
+                    path[-1].add_virtual_loss(path, toplay, 1)
+                    pending[started] = path
+                    pool.apply_async(_rollout_worker,
+                                     (root, board_copy.moves[num_moves:], toplay),
+                                     callback=lambda value, token=started: results.put((token, value)),
+                                     error_callback=lambda e: results.put((None, e)))
+                    started += 1
+                if not pending:
+                    break
+                token, value = results.get()
+                if token is None:
+                    raise value
+                path = pending.pop(token)
+                path[-1].add_virtual_loss(path, toplay, -1)
+                path[-1].update_path(path, value)
+                self.playouts += 1
+        except BaseException:
+            # rollouts may still be running, start over with a new pool
+            self._close_rollout_pool()
+            raise
+
+    def _evaluate_leaf_rollouts(self, board, toplay):
+        """
+        Run self.leaf_rollouts rollouts from board at the same time on the
+        leaf pool and return the number of black wins. The board goes to
+        the workers as to_bytes(), not pickled.
+        """
+        if self._leaf_pool is None or self._leaf_pool_size != self.leaf_rollouts:
+            self._close_leaf_pool()
+            self._leaf_pool = multiprocessing.Pool(self.leaf_rollouts, _seed_worker)
+            self._leaf_pool_size = self.leaf_rollouts
+        task = (type(board), board.to_bytes(), toplay,
+                (self.komi, self.limit, self.simulation_policy,
+                 self.use_pattern, self.check_selfatari))
+        return sum(self._leaf_pool.map(_leaf_rollout, [task]*self.leaf_rollouts))
+
+    def close(self):
+        """
+        Stop the rollout and leaf rollout pools, if there are any.
+        """
+        self._close_rollout_pool()
+        self._close_leaf_pool()
+
+    def _close_leaf_pool(self):
+        if self._leaf_pool is not None:
+            self._leaf_pool.terminate()
+            self._leaf_pool.join()
+            self._leaf_pool = None
+
+    def _close_rollout_pool(self):
+        if self._rollout_pool is not None:
+            self._rollout_pool.terminate()
+            self._rollout_pool.join()
+            self._rollout_pool = None
 
     def _evaluate_rollout(self, board, toplay):
         """
@@ -184,14 +953,36 @@ class MCTS(object):
             num_simulation,
             exploration,
             simulation_policy,
-            in_tree_knowledge):
+            in_tree_knowledge,
+            playout_mode='copy',
+            workers=1,
+            leaf_rollouts=1,
+            deadline=None,
+            max_deadline=None,
+            early_stop=False,
+            expand_threshold=0,
+            widen_k=0,
+            widen_rate=2.0):
         """
         Runs all playouts sequentially and returns the most visited move.
+        With a deadline, a time.time() value, the search also stops on
+        time, see _out_of_time. early_stop ends the search once the most
+        visited move is certain, see _next_lock_check. A leaf is expanded
+        once it has expand_threshold visits, the prior visits of in-tree
+        knowledge included; 0 expands every leaf the first time it is
+        reached. widen_k > 0 turns on progressive widening, see
+        _widen_size.
         """
+        from feature import check_features_weight
+        check_features_weight()
         if self.toplay != toplay:
             sys.stderr.write("Dumping the subtree! \n")
             sys.stderr.flush()
-            self._root = TreeNode(None)
+            self._root = self._new_root()
+        self.reused_visits = int(self._root._n_visits)
+        if self._stop is None:
+            sys.stderr.write("Reused visits: {} \n".format(self.reused_visits))
+            sys.stderr.flush()
         self.komi = komi
         self.limit = limit
         self.check_selfatari = check_selfatari
@@ -200,16 +991,23 @@ class MCTS(object):
         self.exploration = exploration
         self.simulation_policy = simulation_policy
         self.in_tree_knowledge = in_tree_knowledge
+        self.playout_mode = playout_mode
+        self.workers = workers
+        self.leaf_rollouts = leaf_rollouts
+        self.deadline = deadline
+        self.max_deadline = max_deadline
+        self.early_stop = early_stop
+        self.expand_threshold = expand_threshold
+        self.widen_k = widen_k
+        self.widen_rate = widen_rate
 
         if self.in_tree_knowledge == "probabilistic":
             print("\n TODO: Fix in MCTS.py get_move Function to initalized nodes with prior knowledge\n")
 
-        for n in range(num_simulation):
-            board_copy = board.copy()
-            self._playout(board_copy, toplay)
+        self._run_playouts(board, toplay, num_simulation)
 
         # choose a move that has the most visit 
-        moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
+        moves_ls =  [(move, visits) for move, visits, _ in self._root.edges()]
         if not moves_ls:
             return None
         moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
@@ -222,17 +1020,56 @@ class MCTS(object):
         assert board.check_legal(move[0], toplay)
         return move[0]
         
-    def update_with_move(self, last_move):
+    def ponder(self, board, toplay, stop, **kwargs):
+        """
+        Search board until the threading.Event stop is set. Runs in a
+        background thread while the opponent thinks: board is the position
+        after our move and toplay the opponent, the tree grows under the
+        opponent's replies and update_with_move keeps the subtree of the
+        one that is played. kwargs are the get_move arguments apart from
+        num_simulation, deadline, max_deadline and early_stop.
+        """
+        if self.toplay != toplay:
+            return
+        self._stop = stop
+        # the statistics of the last get_move stay those of the last genmove
+        stats = self.playouts, self.saved_playouts, self.reused_visits
+        try:
+            # np.seterr above only holds for the main thread
+            with np.errstate(all='ignore'):
+                self.get_move(board, toplay, num_simulation=sys.maxsize,
+                              early_stop=False, **kwargs)
+        finally:
+            self._stop = None
+            self.ponder_playouts = self.playouts
+            self.playouts, self.saved_playouts, self.reused_visits = stats
+
+    def update_with_move(self, last_move, color=None):
         """
         Step forward in the tree, keeping everything we already know about the subtree, assuming
         that get_move() has been called already. Siblings of the new root will be garbage-collected.
+        last_move None is a pass. color is the color that played last_move, by default the color
+        to play at the root. When it is the other color the tree is for another position and a
+        new root is started.
         """
-        if last_move in self._root._children:
-            self._root = self._root._children[last_move]
+        if last_move is None:
+            last_move = PASS
+        if color is None:
+            color = self.toplay
+        child = None
+        if color == self.toplay:
+            child = self._root.child(last_move)
+        if child is not None:
+            if self._pool is not None:
+                self._pool.release(self._root, keep=child)
+            if self._table is not None:
+                # the entries may hold nodes of the dropped part of the tree
+                self._table.clear()
+            self._root = child
         else:
-            self._root = TreeNode(None)
+            self._root = self._new_root()
         self._root._parent = None
-        self.toplay = GoBoardUtilGo4.opponent(self.toplay)
+        self.toplay = GoBoardUtilGo4.opponent(color)
 
     def good_print(self, board, node, color, num_nodes):
         cboard = board.copy()
@@ -248,11 +1085,11 @@ class MCTS(object):
             else: 
                 pointString = 'Root'
             sys.stderr.write("\nMove: {} Numebr of children {}, Number of visits: {}\n"
-                .format(pointString,len(node._children),node._n_visits))
+                .format(pointString,len(node._moves),node._n_visits))
             sys.stderr.flush()
             moves_ls = []
             max_flag = color == BLACK
-            for move,child in node._children.items():
+            for move,child in node.children():
                 uctval = uct_val(node,child,self.exploration,max_flag)
                 moves_ls.append((move,uctval,child))
             moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
@@ -274,6 +1111,8 @@ class MCTS(object):
                         sys.stderr.flush()
             # Greedily select next move.                
             max_flag = color == BLACK
+            if self.widen_k and node._pending:
+                node.widen(self._widen_size(node._n_visits), self._pool)
             move, next_node = node.select(self.exploration,max_flag)
             if move==PASS:
                 move = None
@@ -293,12 +1132,12 @@ class MCTS(object):
 
     def print_stat(self, board, root, color):
         s_color = GoBoardUtilGo4.int_to_color(color)
-        sys.stderr.write("Number of children {} \n".format(len(root._children)))
+        sys.stderr.write("Number of children {} \n".format(len(root.children())))
         sys.stderr.flush()
         sys.stderr.write("Number of roots visits: {} \n".format(root._n_visits))
         sys.stderr.flush()
         stats=[]
-        for move,node in root._children.items():
+        for move,node in root.children():
             if color == BLACK:
                 wins = node._black_wins
             else:
@@ -319,7 +1158,7 @@ class MCTS(object):
         s_color = GoBoardUtilGo4.int_to_color(color)
 
         stats=[]
-        for move,node in root._children.items():
+        for move,node in root.children():
             if color == BLACK:
                 wins = node._black_wins
             else:
@@ -348,54 +1187,23 @@ class MCTS(object):
         #sys.stderr.write("Sstatistics: {} \n".format(lst))
         sys.stderr.flush()
         return master
-    def prior_knowledge_move(self,
-            board,
-            toplay,
-            komi,
-            limit,
-            check_selfatari,
-            use_pattern,
-            num_simulation,
-            exploration,
-            simulation_policy,
-            in_tree_knowledge):
+    def prior_knowledge_move(self, board, toplay, **kwargs):
         """
-        Runs all playouts sequentially and returns the most visited move.
+        Search board with get_move, which takes the same arguments, and
+        return prior_knowledge_stat of the root children.
         """
-        if self.toplay != toplay:
-            sys.stderr.write("Dumping the subtree! \n")
-            sys.stderr.flush()
-            self._root = TreeNode(None)
-        self.komi = komi
-        self.limit = limit
-        self.check_selfatari = check_selfatari
-        self.use_pattern = use_pattern
-        self.toplay = toplay
-        self.exploration = exploration
-        self.simulation_policy = simulation_policy
-        self.in_tree_knowledge = in_tree_knowledge
-
-        if self.in_tree_knowledge == "probabilistic":
-            print("\n TODO: Fix in MCTS.py get_move Function to initalized nodes with prior knowledge\n")
-
-        for n in range(num_simulation):
-            board_copy = board.copy()
-            self._playout(board_copy, toplay)
-
-        # choose a move that has the most visit 
-        moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
-        if not moves_ls:
-            return None
-        moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
-        move = moves_ls[0]
-        lst = self.prior_knowledge_stat(board, self._root, toplay)
-        return lst
+        self.get_move(board, toplay, **kwargs)
+        return self.prior_knowledge_stat(board, self._root, toplay)
 
 
 def generate_moves_with_feature_based_probs(board, color):
         from feature import Features_weight
         from feature import Feature
+        from feature import move_prob_cache
         assert len(Features_weight) != 0
+        cached = move_prob_cache.get(board, color)
+        if cached is not None:
+            return cached
         moves = []
         gamma_sum = 0.0
         empty_points = board.get_empty_points()
@@ -410,4 +1218,178 @@ def generate_moves_with_feature_based_probs(board, color):
             assert gamma_sum != 0.0
             for m in moves:
                 probs[m] = probs[m] / gamma_sum
-        return moves, probs
\ No newline at end of file
+        move_prob_cache.store(board, color, moves, probs)
+        return moves, probs
+
+_worker_state = {}
+
+def _seed_worker():
+    """
+    Forked workers inherit the random state of the parent, reseed them.
+    """
+    seed = (os.getpid() * 1000003) & 0xffffffff
+    random.seed(seed)
+    np.random.seed(seed)
+
+def _set_rollout_root(root):
+    """
+    Set up a rollout worker process for the search root, (search id,
+    board class, board bytes, rollout settings).
+    """
+    search_id, board_class, data, (komi, limit, simulation_policy, use_pattern, check_selfatari) = root
+    board = board_class.from_bytes(data)
+    if simulation_policy == 'probabilistic':
+        # the pool outlives the search that reloaded the weights
+        from feature import check_features_weight
+        check_features_weight()
+    _worker_state['search_id'] = search_id
+    _worker_state['snapshot'] = board.snapshot()
+    _worker_state['board'] = board
+    _worker_state['kwargs'] = dict(komi=komi,
+                                   limit=limit,
+                                   simulation_policy=simulation_policy,
+                                   use_pattern=use_pattern,
+                                   check_selfatari=check_selfatari)
+
+def _rollout_worker(root, moves, toplay):
+    """
+    Play moves from the search root, alternating colors from toplay, and
+    return 1 if black wins the rollout from there, 0 otherwise.
+    """
+    if _worker_state.get('search_id') != root[0]:
+        _set_rollout_root(root)
+    board = _worker_state['board']
+    board.restore(_worker_state['snapshot'])
+    color = toplay
+    for move in moves:
+        board.move(move, color)
+        color = GoBoardUtilGo4.opponent(color)
+    winner = GoBoardUtilGo4.playGame(board, color, **_worker_state['kwargs'])
+    if winner == BLACK:
+        return 1
+    else:
+        return 0
+
+def _leaf_rollout(task):
+    """
+    One rollout of leaf parallelism: rebuild the board from its bytes and
+    return 1 if black wins the rollout, 0 otherwise.
+    """
+    board_class, data, toplay, (komi, limit, simulation_policy, use_pattern, check_selfatari) = task
+    board = board_class.from_bytes(data)
+    if simulation_policy == 'probabilistic':
+        # the pool outlives the search that reloaded the weights
+        from feature import check_features_weight
+        check_features_weight()
+    winner = GoBoardUtilGo4.playGame(board, toplay,
+                komi=komi,
+                limit=limit,
+                simulation_policy=simulation_policy,
+                use_pattern=use_pattern,
+                check_selfatari=check_selfatari)
+    if winner == BLACK:
+        return 1
+    else:
+        return 0
+
+class RootParallelMCTS(object):
+    """
+    Root-parallel search: num_workers processes each keep their own MCTS
+    and search the same position with their own random seed. The root
+    child visits and black wins of all workers are summed to pick the
+    move. The processes live as long as this object, and every worker
+    keeps its subtree between moves through update_with_move.
+
+    The search counters of MCTS are the sums over the workers, and
+    node_depth sums the nodes at each depth of their trees.
+    """
+    def __init__(self, num_workers, tree='node', tt_size=0, seed=None, node_budget=0):
+        if seed is None:
+            seed = random.randrange(1 << 30)
+        self.num_workers = num_workers
+        self._conns = []
+        self._processes = []
+        for i in range(num_workers):
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_root_worker,
+                                              args=(child_conn, seed + i, tree, tt_size, node_budget))
+            process.daemon = True
+            process.start()
+            self._conns.append(conn)
+            self._processes.append(process)
+        self.stats = []
+        self.playouts = 0
+        self.saved_playouts = 0
+        self.reused_visits = 0
+        # root-parallel search does not ponder
+        self.ponder_playouts = 0
+        # nodes at each depth summed over the workers, None before the first search
+        self.node_depth = None
+
+    def _broadcast(self, command, args):
+        for conn in self._conns:
+            conn.send((command, args))
+
+    def get_move(self, board, toplay, num_simulation, **kwargs):
+        """
+        Search board on all workers, each with its share of num_simulation
+        playouts, and return the move with the most merged root visits,
+        None for a pass. The other arguments are those of MCTS.get_move.
+        """
+        kwargs['num_simulation'] = -(-num_simulation // self.num_workers)
+        self._broadcast('search', (board, toplay, kwargs))
+        merged = {}
+        self.playouts = self.saved_playouts = self.reused_visits = 0
+        self.node_depth = None
+        for conn in self._conns:
+            edges, (playouts, saved_playouts, reused_visits), depth = conn.recv()
+            for move, visits, black_wins in edges:
+                stats = merged.setdefault(move, [0, 0])
+                stats[0] += visits
+                stats[1] += black_wins
+            self.playouts += playouts
+            self.saved_playouts += saved_playouts
+            self.reused_visits += reused_visits
+            if self.node_depth is None:
+                self.node_depth = depth
+            else:
+                self.node_depth = [a + b for a, b in zip(self.node_depth, depth)]
+        # (move, visits, black wins), most visited first
+        self.stats = sorted(((move, s[0], s[1]) for move, s in merged.items()),
+                            key=lambda i:i[1], reverse=True)
+        if not self.stats or self.stats[0][0] == PASS:
+            return None
+        return self.stats[0][0]
+
+    def update_with_move(self, last_move, color=None):
+        self._broadcast('update', (last_move, color))
+
+    def reset(self):
+        self._broadcast('reset', None)
+
+    def close(self):
+        self._broadcast('close', None)
+        for process in self._processes:
+            process.join()
+
+def _root_worker(conn, seed, tree, tt_size, node_budget):
+    """
+    Command loop of a RootParallelMCTS worker process.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    mcts = MCTS(tree, tt_size, node_budget)
+    while True:
+        command, args = conn.recv()
+        if command == 'search':
+            board, toplay, kwargs = args
+            mcts.get_move(board, toplay, **kwargs)
+            conn.send((mcts._root.edges(),
+                       (mcts.playouts, mcts.saved_playouts, mcts.reused_visits),
+                       node_depth(mcts._root)))
+        elif command == 'update':
+            mcts.update_with_move(*args)
+        elif command == 'reset':
+            mcts = MCTS(tree, tt_size, node_budget)
+        elif command == 'close':
+            break
@@ -0,0 +1,107 @@
+"""
+Time management for Go5.
+
+TimeControl turns the GTP clock (time_settings and time_left) or a fixed
+time per move into the time budget of the next search. The search gets
+two limits: it stops at the first one when the root has settled on a
+move, and may run on to the second one while the two most visited moves
+are still close, so critical moves get more time.
+"""
+from board_util import BLACK, WHITE
+
+class TimeControl(object):
+
+    # seconds kept back to send the genmove response
+    SAFETY_MARGIN = 0.2
+    # shortest search, even when the clock is almost out
+    MIN_TIME = 0.05
+    # fewest own moves assumed to be left in main time
+    MIN_MOVES_LEFT = 10
+    # an unsettled search may run this many times its budget
+    EXTENSION = 2.0
+    # but never on more than this share of the main time left
+    MAX_SHARE = 0.25
+
+    def __init__(self, move_time=0.0):
+        """
+        move_time > 0 gives every move that many seconds, until GTP
+        time_settings starts a timed game.
+        """
+        self.move_time = move_time
+        self.main_time = 0.0
+        self.byo_yomi_time = 0.0
+        self.byo_yomi_stones = 0
+        self.timed = False
+        self.time_left = {BLACK: 0.0, WHITE: 0.0}
+        self.stones_left = {BLACK: 0, WHITE: 0}
+
+    def set_time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
+        """
+        GTP time_settings, Canadian byo-yomi. byo_yomi_time > 0 with no
+        byo_yomi_stones means no time limit.
+        """
+        self.main_time = main_time
+        self.byo_yomi_time = byo_yomi_time
+        self.byo_yomi_stones = byo_yomi_stones
+        self.timed = main_time > 0 or byo_yomi_stones > 0
+        for color in [BLACK, WHITE]:
+            self.time_left[color] = main_time
+            self.stones_left[color] = 0
+        if main_time <= 0:
+            self._start_period(BLACK)
+            self._start_period(WHITE)
+
+    def set_time_left(self, color, time_left, stones_left):
+        """
+        GTP time_left: the seconds left for color, and the stones left to
+        play in them when in byo-yomi, 0 in main time.
+        """
+        self.time_left[color] = time_left
+        self.stones_left[color] = stones_left
+
+    def _start_period(self, color):
+        self.time_left[color] = self.byo_yomi_time
+        self.stones_left[color] = self.byo_yomi_stones
+
+    def budget(self, board, color):
+        """
+        (seconds, max_seconds) for the next search of color on board, or
+        None when neither the GTP clock nor move_time limits the search.
+        """
+        if not self.timed:
+            if self.move_time <= 0:
+                return None
+            seconds = max(self.move_time - self.SAFETY_MARGIN, self.MIN_TIME)
+            return seconds, seconds
+        if (self.stones_left[color] == 0 and self.time_left[color] <= 0
+                and self.byo_yomi_stones > 0):
+            # main time is used up, byo-yomi starts
+            self._start_period(color)
+        time_left = self.time_left[color] - self.SAFETY_MARGIN
+        stones_left = self.stones_left[color]
+        if stones_left > 0:
+            # a byo-yomi period is shared evenly, there is no time to extend
+            seconds = max(time_left / stones_left, self.MIN_TIME)
+            return seconds, seconds
+        moves_left = max(len(board.get_empty_points()) // 2, self.MIN_MOVES_LEFT)
+        seconds = time_left / moves_left
+        if self.byo_yomi_stones > 0:
+            seconds = max(seconds, self.byo_yomi_time / self.byo_yomi_stones)
+        seconds = max(seconds, self.MIN_TIME)
+        max_seconds = max(min(seconds * self.EXTENSION, time_left * self.MAX_SHARE), seconds)
+        return seconds, max_seconds
+
+    def used(self, color, seconds):
+        """
+        Charge seconds to the clock of color. This keeps the clock for
+        controllers that do not send time_left before every genmove.
+        """
+        if not self.timed:
+            return
+        self.time_left[color] -= seconds
+        if self.stones_left[color] > 0:
+            self.stones_left[color] -= 1
+            if self.stones_left[color] == 0:
+                self._start_period(color)
+        elif self.time_left[color] <= 0 and self.byo_yomi_stones > 0:
+            self._start_period(color)
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+"""
+Micro benchmarks for SimpleGoBoard.
+
+Usage:
+    python3 bench_board.py playouts --sizes 7 9 --num 200
+    python3 bench_board.py copy --sizes 7 9 --num 10000
+    python3 bench_board.py flood --sizes 9 19 --num 2000
+    python3 bench_board.py score --sizes 7 9 13 19 --num 200
+    python3 bench_board.py reset --sizes 7 9 19 --num 10000
+    python3 bench_board.py playouts --board bit
+    python3 bench_board.py compare --sizes 5 7 9 --num 20
+
+compare plays random games on SimpleGoBoard and BitGoBoard side by side and
+raises AssertionError as soon as the two boards disagree. It also checks
+that boards rebuilt by from_bytes(to_bytes()) agree with the original.
+"""
+import os, sys
+import time
+import random
+import argparse
+import numpy as np
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, FLOODFILL
+from simple_board import SimpleGoBoard
+from bit_board import BitGoBoard
+
+BOARDS = {'array': SimpleGoBoard, 'bit': BitGoBoard}
+
+def bench_playouts(board_class, size, num, limit, komi):
+    """
+    Play num random playouts from the empty board and return playouts/sec.
+    """
+    board = board_class(size)
+    start = time.time()
+    for _ in range(num):
+        cboard = board.copy()
+        GoBoardUtil.playGame(cboard, BLACK, komi=komi, limit=limit,
+                             random_simulation=True)
+    elapsed = time.time() - start
+    return num / elapsed
+
+def midgame_board(board_class, size, num_moves):
+    """
+    Return a board after num_moves random moves from the empty board.
+    """
+    board = board_class(size)
+    color = BLACK
+    for _ in range(num_moves):
+        move = GoBoardUtil.generate_random_move(board, color, True)
+        board.move(move, color)
+        color = GoBoardUtil.opponent(color)
+    return board
+
+def bench_copy(board_class, size, num):
+    """
+    Return (copies/sec, snapshots into an earlier snapshot/sec,
+    restores/sec) for a board in the middle of a game.
+    """
+    board = midgame_board(board_class, size, size*size//2)
+    start = time.time()
+    for _ in range(num):
+        board.copy()
+    copy_rate = num / (time.time() - start)
+    snapshot = board.snapshot()
+    start = time.time()
+    for _ in range(num):
+        board.snapshot(snapshot)
+    snapshot_rate = num / (time.time() - start)
+    scratch = board.copy()
+    start = time.time()
+    for _ in range(num):
+        scratch.restore(snapshot)
+    restore_rate = num / (time.time() - start)
+    return copy_rate, snapshot_rate, restore_rate
+
+def run_copy(args):
+    for size in args.sizes:
+        rates = bench_copy(BOARDS[args.board], size, args.num)
+        print("{0}x{0}: copy {1:.0f}/sec, snapshot into {2:.0f}/sec, restore {3:.0f}/sec".format(size, *rates))
+
+def ladder_board(size):
+    """
+    Return a board with a black staircase string along the diagonal, which
+    white surrounds except at its far end, and a point of the string.
+    """
+    board = SimpleGoBoard(size)
+    stairs = []
+    for i in range(1, size):
+        stairs.append(board._coord_to_point(i, i))
+        stairs.append(board._coord_to_point(i, i+1))
+    for p in stairs:
+        board.move(p, BLACK)
+    for p in stairs[:-2]:
+        for n in board._neighbors(p):
+            if board.get_color(n) == EMPTY:
+                board.move(n, WHITE)
+    return board, stairs[0]
+
+def recursive_liberty_flood(board, point):
+    """
+    The liberty search SimpleGoBoard used before the string table: copy the
+    board and recurse once per stone until a liberty is found.
+    """
+    fboard = np.array(board.board, copy=True)
+    color = fboard[point]
+    def flood_rec(p):
+        fboard[p] = FLOODFILL
+        for n in board._neighbors(p):
+            if fboard[n] == EMPTY:
+                return True
+            if fboard[n] == color and flood_rec(n):
+                return True
+        return False
+    return flood_rec(point)
+
+def mark_flood(board, point):
+    """
+    Find the block of point by flood fill, marking the visited points in
+    the shared mark array of the board instead of a copy of the board.
+    Returns the points of the block.
+    """
+    marks = board._marks.marks
+    gen = board._marks.next_gen()
+    color = board.board[point]
+    marks[point] = gen
+    block = [point]
+    pointstack = [point]
+    while pointstack:
+        current_point = pointstack.pop()
+        for n in board._neighbors(current_point):
+            if marks[n] != gen and board.board[n] == color:
+                marks[n] = gen
+                block.append(n)
+                pointstack.append(n)
+    return block
+
+def bench_flood(size, num):
+    """
+    Return the microseconds per call of the recursive liberty search, of
+    _liberty and of the mark array flood on a ladder-like string.
+    """
+    board, point = ladder_board(size)
+    times = []
+    for f in [lambda: recursive_liberty_flood(board, point),
+              lambda: board._liberty(point, BLACK),
+              lambda: mark_flood(board, point)]:
+        start = time.time()
+        for _ in range(num):
+            f()
+        times.append(1e6 * (time.time() - start) / num)
+    return board, point, times
+
+def run_flood(args):
+    for size in args.sizes:
+        board, point, times = bench_flood(size, args.num)
+        print("{0}x{0} string of {1} stones, {2} liberties: recursive {3:.1f}us, "
+              "_liberty {4:.1f}us, mark flood {5:.1f}us".format(size,
+              board._string_size[board._string_of[point]],
+              board._liberty(point, BLACK), *times))
+
+def bench_score(board_class, size, num, komi):
+    """
+    Return the microseconds per score() call on boards at the end of random
+    playouts.
+    """
+    boards = []
+    for _ in range(10):
+        board = board_class(size)
+        GoBoardUtil.playGame(board, BLACK, komi=komi, limit=size*size*3,
+                             random_simulation=True)
+        boards.append(board)
+    start = time.time()
+    for i in range(num):
+        boards[i % len(boards)].score(komi)
+    return 1e6 * (time.time() - start) / num
+
+def run_score(args):
+    for size in args.sizes:
+        usec = bench_score(BOARDS[args.board], size, args.num, args.komi)
+        print("{0}x{0}: score {1:.1f}us".format(size, usec))
+
+def bench_reset(board_class, size, num):
+    """
+    Return the microseconds per reset() of a board to a size it already had.
+    """
+    board = board_class(size)
+    start = time.time()
+    for _ in range(num):
+        board.reset(size)
+    return 1e6 * (time.time() - start) / num
+
+def run_reset(args):
+    for size in args.sizes:
+        usec = bench_reset(BOARDS[args.board], size, args.num)
+        print("{0}x{0}: reset {1:.1f}us".format(size, usec))
+
+def compare_boards(a, b, komi):
+    """
+    Assert that two boards agree on the position and on every query the
+    players make.
+    """
+    assert (a.board == b.board).all()
+    assert sorted(a.get_empty_points()) == sorted(b.get_empty_points())
+    assert a.ko_constraint == b.ko_constraint
+    assert a.zobrist_key == b.zobrist_key
+    assert a.score(komi) == b.score(komi)
+    for p in a.get_empty_points():
+        assert a.neighborhood_33(p) == b.neighborhood_33(p)
+        for color in [BLACK, WHITE]:
+            assert a.check_legal(p, color) == b.check_legal(p, color)
+            assert a.is_eye(p, color) == b.is_eye(p, color)
+        for n in a._neighbors(p):
+            color = a.get_color(n)
+            if color != EMPTY:
+                assert a._liberty_point(n, color) == b._liberty_point(n, color)
+
+def run_compare(args):
+    """
+    Differential test of BitGoBoard against SimpleGoBoard on random games,
+    including undo_move.
+    """
+    for size in args.sizes:
+        for _ in range(args.num):
+            a = SimpleGoBoard(size)
+            b = BitGoBoard(size)
+            color = BLACK
+            for _ in range(args.limit):
+                move = GoBoardUtil.generate_random_move(a, color, True)
+                if random.random() < 0.2:
+                    assert a.move(move, color) and b.move(move, color)
+                    a.undo_move()
+                    b.undo_move()
+                    compare_boards(a, b, args.komi)
+                assert a.move(move, color) and b.move(move, color)
+                compare_boards(a, b, args.komi)
+                for board_class in BOARDS.values():
+                    compare_boards(a, board_class.from_bytes(a.to_bytes()), args.komi)
+                if a.end_of_game():
+                    break
+                color = GoBoardUtil.opponent(color)
+        print("{0}x{0}: {1} games agree".format(size, args.num))
+
+def run_playouts(args):
+    for size in args.sizes:
+        rate = bench_playouts(BOARDS[args.board], size, args.num, args.limit, args.komi)
+        print("{0}x{0}: {1:.1f} playouts/sec".format(size, rate))
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('bench', type=str, choices=['playouts', 'copy', 'flood', 'score', 'reset', 'compare'], help='benchmark to run')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[7, 9], help='board sizes to benchmark')
+    parser.add_argument('--num', type=int, default=200, help='number of playouts, copies, floods, scores, resets or games per board size')
+    parser.add_argument('--board', type=str, choices=list(BOARDS), default='array', help='board implementation')
+    parser.add_argument('--limit', type=int, default=100, help='maximum number of moves per playout')
+    parser.add_argument('--komi', type=float, default=6.5, help='komi used for scoring')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+    np.random.seed(args.seed)
+    random.seed(args.seed)
+    if args.bench == 'playouts':
+        run_playouts(args)
+    elif args.bench == 'copy':
+        run_copy(args)
+    elif args.bench == 'flood':
+        run_flood(args)
+    elif args.bench == 'score':
+        run_score(args)
+    elif args.bench == 'reset':
+        run_reset(args)
+    elif args.bench == 'compare':
+        run_compare(args)
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Bitboard version of SimpleGoBoard for small boards.
+
+The stones of each color are kept in one Python int, bit p is set when
+point p has a stone of that color. Points use the same one dimensional
+numbering as SimpleGoBoard, so shifting by 1 or NS moves to a neighbor and
+the border points fall out of the on_board mask. Every block is kept as
+one bitboard, updated by the moves: placing a stone ORs the blocks it
+joins, a capture clears a block, and only undo floods to split a block
+again. Liberties, captures, eyes and area scoring become shifts and masks
+instead of per-point numpy indexing. This pays off while a board fits in
+a couple of machine words, i.e. up to 9x9.
+
+Points may come in as numpy integers, they are converted to int before
+shifting so the bitboards stay Python ints.
+
+The numpy board array, the empty point list, the move stacks and the
+Zobrist key are maintained exactly as in SimpleGoBoard: the features,
+patterns, random move generation and the transposition table read them,
+so every caller of SimpleGoBoard works with BitGoBoard as well. The string
+table of SimpleGoBoard is not kept.
+"""
+
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY
+from simple_board import SimpleGoBoard
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+def bit_points(bits):
+    """
+    List of the points whose bit is set in bits.
+    """
+    points = []
+    while bits:
+        low = bits & -bits
+        points.append(low.bit_length() - 1)
+        bits ^= low
+    return points
+
+class BitGoBoard(SimpleGoBoard):
+
+    _shared_fields = SimpleGoBoard._shared_fields + ('_on_board', '_neighbor_masks')
+
+    _mutable_lists = ('moves', 'ko_constraints', 'captured_stones', 'pass_record',
+                      'last2_moves', 'player_record', '_empty_positions', '_empty_index',
+                      '_color_bits', '_block_of', '_block_stones', '_key_history')
+    __slots__ = ('_on_board', '_neighbor_masks', '_color_bits', '_block_of', '_block_stones')
+
+    def _init_strings(self):
+        """
+        Bitboards replace the string table of SimpleGoBoard.
+        _color_bits[color] holds the stones of color. Blocks are kept
+        incrementally: _block_of[p] is the anchor point of the block of
+        the stone on p, 0 for an empty point, and _block_stones[anchor]
+        holds the stones of that block.
+        """
+        self._color_bits = [0, 0, 0]
+        self._block_of = [0]*self.maxpoint
+        self._block_stones = [0]*self.maxpoint
+        self._on_board = self._geometry.on_board_mask
+        self._neighbor_masks = self._geometry.neighbor_masks
+
+    def _build_strings(self):
+        for p in self._geometry.points:
+            color = self.board[p]
+            if color != EMPTY:
+                self._color_bits[color] |= 1 << p
+        for color in [BLACK, WHITE]:
+            for p in bit_points(self._color_bits[color]):
+                if not self._block_of[p]:
+                    self._set_block(p, self._block_bits(p, self._color_bits[color]))
+
+    def _set_block(self, anchor, block):
+        """
+        Make block a block with the given anchor.
+        """
+        block_of = self._block_of
+        for s in bit_points(block):
+            block_of[s] = anchor
+        self._block_stones[anchor] = block
+
+    def _expand(self, bits):
+        """
+        Points on the board next to any point in bits.
+        """
+        ns = self.NS
+        return ((bits << 1) | (bits >> 1) | (bits << ns) | (bits >> ns)) & self._on_board
+
+    def _empty_bits(self):
+        return self._on_board & ~(self._color_bits[BLACK] | self._color_bits[WHITE])
+
+    def _block_bits(self, point, bits):
+        """
+        The block of points in bits connected to point, by flooding.
+        Only used for empty regions and to split blocks on undo.
+        """
+        block = 1 << int(point)
+        frontier = block
+        while frontier:
+            frontier = self._expand(frontier) & bits & ~block
+            block |= frontier
+        return block
+
+    def _captured_bits(self, point, color, empty):
+        """
+        Opponent blocks next to point which have no liberty in empty.
+        """
+        point = int(point)
+        opp_bits = self._color_bits[GoBoardUtil.opponent(color)]
+        captured = 0
+        for n in self.neighbors_dic[point]:
+            if (opp_bits >> n) & 1 and not (captured >> n) & 1:
+                block = self._block_stones[self._block_of[n]]
+                if not self._expand(block) & empty:
+                    captured |= block
+        return captured
+
+    def _is_suicide(self, point, color):
+        point = int(point)
+        color_bits = self._color_bits
+        # point is empty, and empty never has bits off the board
+        empty = self._on_board & ~(color_bits[BLACK] | color_bits[WHITE]) ^ (1 << point)
+        if self._neighbor_masks[point] & empty:
+            return False
+        # every neighbor holds a stone: a neighbor block of color with
+        # another liberty, or an opponent block captured by the move,
+        # gives the move a liberty
+        own_bits = color_bits[color]
+        block_of = self._block_of
+        block_stones = self._block_stones
+        ns = self.NS
+        for n in self.neighbors_dic[point]:
+            b = block_stones[block_of[n]]
+            has_liberty = ((b << 1) | (b >> 1) | (b << ns) | (b >> ns)) & empty
+            if ((own_bits >> n) & 1) == (not not has_liberty):
+                return False
+        return True
+
+    def _repeats_position(self, point, color):
+        point = int(point)
+        key = self._stones_key ^ self._zobrist.stones[color][point]
+        empty = self._empty_bits() & ~(1 << point)
+        keys = self._zobrist.stones[GoBoardUtil.opponent(color)]
+        for s in bit_points(self._captured_bits(point, color, empty)):
+            key ^= keys[s]
+        return key in self._key_counts
+
+    def _place_stone(self, point, color):
+        point = int(point)
+        bit = 1 << point
+        self.board[point] = color
+        self._stones_key ^= self._zobrist.stones[color][point]
+        color_bits = self._color_bits
+        color_bits[color] |= bit
+        opp = GoBoardUtil.opponent(color)
+        block_of = self._block_of
+        block_stones = self._block_stones
+        caps = []
+        single_captures = []
+        empty = self._on_board & ~(color_bits[BLACK] | color_bits[WHITE])
+        ns = self.NS
+        anchor = 0
+        merged = bit
+        for n in self.neighbors_dic[point]:
+            a = block_of[n]
+            if not a:
+                continue
+            block = block_stones[a]
+            if (color_bits[color] >> n) & 1:
+                if anchor == 0:
+                    anchor = a
+                elif a != anchor:
+                    # relabel the other block into the first one
+                    for s in bit_points(block):
+                        block_of[s] = anchor
+                    block_stones[a] = 0
+                    merged |= block
+            elif not ((block << 1) | (block >> 1) | (block << ns) | (block >> ns)) & empty:
+                color_bits[opp] ^= block
+                block_stones[a] = 0
+                keys = self._zobrist.stones[opp]
+                stones = bit_points(block)
+                for s in stones:
+                    self.board[s] = EMPTY
+                    self._stones_key ^= keys[s]
+                    block_of[s] = 0
+                if len(stones) == 1:
+                    single_captures.append(stones[0])
+                caps.extend(stones)
+                empty |= block
+        if anchor == 0:
+            anchor = point
+        block_of[point] = anchor
+        block_stones[anchor] |= merged
+        return caps, single_captures
+
+    def _lift_stone(self, point, caps):
+        """
+        Take back the stone on point and put back the captured stones.
+        The block of the stone may fall apart, its neighbor blocks and
+        the captured blocks are flooded again.
+        """
+        point = int(point)
+        bit = 1 << point
+        color = BLACK if self._color_bits[BLACK] & bit else WHITE
+        self._color_bits[color] ^= bit
+        anchor = self._block_of[point]
+        rest = self._block_stones[anchor] & ~bit
+        self._block_stones[anchor] = 0
+        self._block_of[point] = 0
+        for n in self.neighbors_dic[point]:
+            if (rest >> n) & 1:
+                block = self._block_bits(n, rest)
+                rest ^= block
+                self._set_block(n, block)
+        if caps:
+            opp = GoBoardUtil.opponent(color)
+            captured = 0
+            for p in caps:
+                captured |= 1 << int(p)
+            self._color_bits[opp] |= captured
+            while captured:
+                p = (captured & -captured).bit_length() - 1
+                block = self._block_bits(p, captured)
+                captured ^= block
+                self._set_block(p, block)
+
+    def _liberty_point(self, point, color):
+        point = int(point)
+        block = self._block_stones[self._block_of[point]]
+        libs = self._expand(block) & self._empty_bits()
+        liberty = popcount(libs)
+        if liberty == 1:
+            return liberty, libs.bit_length() - 1
+        return liberty, None
+
+    def _is_eyeish(self, point):
+        neighbors = self._neighbor_masks[point]
+        if not neighbors:
+            return None
+        if not neighbors & ~self._color_bits[BLACK]:
+            return BLACK
+        if not neighbors & ~self._color_bits[WHITE]:
+            return WHITE
+        return None
+
+    def is_eye(self, point, color):
+        """
+        Same as SimpleGoBoard.is_eye, counting the diagonal points with masks.
+        """
+        eye_color = self._is_eyeish(point)
+        if eye_color != color or eye_color == None:
+            return None
+        diag = self._geometry.diag_masks[point]
+        on_board = diag & self._on_board
+        false_count = popcount(on_board & self._color_bits[GoBoardUtil.opponent(eye_color)])
+        if on_board != diag:
+            false_count += 1
+        if false_count >= 2:
+            return None
+        return eye_color
+
+    def score(self, komi):
+        """
+        Area score, every empty region is found with one block flood.
+        """
+        black = self._color_bits[BLACK]
+        white = self._color_bits[WHITE]
+        black_score = popcount(black)
+        white_score = popcount(white) + komi
+        empty = self._empty_bits()
+        while empty:
+            low = empty & -empty
+            region = self._block_bits(low.bit_length() - 1, empty)
+            empty ^= region
+            border = self._expand(region)
+            if not border & white:
+                if border & black:
+                    black_score += popcount(region)
+            elif not border & black:
+                white_score += popcount(region)
+        return self._winner(black_score, white_score)
+
+    def neighborhood_33(self, point):
+        point = int(point)
+        own = self._color_bits[self.current_player]
+        opp = self._color_bits[GoBoardUtil.opponent(self.current_player)]
+        positions = [point-self.NS-1, point-self.NS, point-self.NS+1,
+                     point-1, point, point+1,
+                     point+self.NS-1, point+self.NS, point+self.NS+1]
+        pattern = ""
+        for d in positions:
+            if (own >> d) & 1:
+                pattern += 'X'
+            elif (opp >> d) & 1:
+                pattern += 'x'
+            elif (self._on_board >> d) & 1:
+                pattern += '.'
+            else:
+                pattern += ' '
+        return pattern
@@ -5,7 +5,6 @@ BORDER = 3
 FLOODFILL = 4
 import numpy as np
 import random
-import copy
 from pattern import pat3set
 import sys
 
@@ -55,13 +54,9 @@ class GoBoardUtil(object):
         color : {'b','w'}
             the color to generate the move for.
         """
-        moves = board.get_empty_points()
-        num_moves = len(moves)
-        np.random.shuffle(moves)
-        for i in range(num_moves):
-            if is_eye_filter and board.is_eye(moves[i],color):
+        for move in board.random_empty_points():
+            if is_eye_filter and board.is_eye(move,color):
                 continue
-            move = moves[i]
             legal = board.check_legal(move,color)
             if not legal:
                 continue
@@ -163,9 +158,8 @@ class GoBoardUtil(object):
          
     @staticmethod
     def copyb2b(board,copy_board):
-        """Return an independent copy of this Board."""
-        copy_board.__dict__ = copy.deepcopy(board.__dict__)
-        assert copy_board.board.all() == board.board.all()
+        """Copy board into copy_board in place and return copy_board."""
+        copy_board.restore(board)
         return copy_board
 
     @staticmethod
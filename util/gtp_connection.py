@@ -267,12 +267,14 @@ class GtpConnection():
         args[0] : str
             the move to handicap (e.g. B2)
         """
-        self.board.reset(self.board.size)
+        self.reset(self.board.size)
         for point in args:
             move = GoBoardUtil.move_to_coord(point, self.board.size)
             point = self.board._coord_to_point(*move)
             if not self.board.move(point, BLACK):
                 self.debug_msg("Illegal Move: {}\nBoard:\n{}\n".format(move, str(self.board.get_twoD_board())))
+            elif self.go_engine.name == 'Go5':
+                self.go_engine.play(point, BLACK)
         self.respond()
 
     def legal_moves_for_toPlay_cmd(self, args):
@@ -375,6 +377,8 @@ class GtpConnection():
                 self.debug_msg("Player {} is passing\n".format(args[0]))
                 self.board.move(None, color)
                 self.board.current_player = GoBoardUtil.opponent(color)
+                if self.go_engine.name == 'Go5':
+                    self.go_engine.play(None, color)
                 self.respond()
                 return
             move = GoBoardUtil.move_to_coord(args[1], self.board.size)
@@ -389,6 +393,8 @@ class GtpConnection():
                 return
             else:
                 self.debug_msg("Move: {}\nBoard:\n{}\n".format(board_move, str(self.board.get_twoD_board())))
+            if self.go_engine.name == 'Go5':
+                self.go_engine.play(move, color)
             self.respond()
         except Exception as e:
             self.respond('Error: {}'.format(str(e)))
@@ -474,18 +480,29 @@ class GtpConnection():
 
     def mcts_info_cmd(self, args):
         try:
-            root = self.go_engine.parent
-            if not root:
+            nodesAtDepth = self.go_engine.last_node_depth()
+            if nodesAtDepth is None:
                 self.respond("No avaiable MCTS tree")
                 return
-            nodesAtDepth = self.go_engine.get_node_depth(root)
             output="\n"
-            prev_nodes = 1
+            # the root-parallel tree sums one root per worker
+            prev_nodes = max(nodesAtDepth[0], 1)
             for i, count in enumerate(nodesAtDepth):
                 if count == 0:
                     break
                 output += "Nodes at depth {}: {}, effective branching factor: {:.2}\n".format(i, count, count / prev_nodes)
                 prev_nodes = count
+            if self.go_engine.name == 'Go5':
+                search = self.go_engine.last_search()
+                if self.go_engine.root_workers > 1:
+                    output += "Summed over {} root workers\n".format(self.go_engine.root_workers)
+                output += "Playouts: {}, saved by early stop: {}, reused visits: {}, pondered: {}\n".format(
+                          search.playouts, search.saved_playouts,
+                          search.reused_visits, search.ponder_playouts)
+                from feature import move_prob_cache
+                output += "Prior cache: {} positions, {} hits, {} misses, hit rate {:.1%}\n".format(
+                          len(move_prob_cache), move_prob_cache.hits, move_prob_cache.misses,
+                          move_prob_cache.hit_rate())
             sys.stderr.write('{}\n'.format(output))
             sys.stderr.flush()
             self.respond()
@@ -14,13 +14,168 @@ glossary:
 
 
 import numpy as np
-import copy
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, FLOODFILL 
-import sys
-sys.setrecursionlimit(1000000)
+import random
+import struct
+
+ZOBRIST_SEED = 496
+# to_bytes header: size, current_player, num_pass, ko_constraint, last_move,
+# last2_move, with 0 (a border point) standing for None
+_BYTES_HEADER = struct.Struct('<BBHHHH')
+_zobrist_tables = {}
+
+class ZobristTable(object):
+    """
+    Random 64-bit keys for a board with maxpoint points. The seed is fixed so
+    keys agree between processes, and the table is shared by all boards of
+    the same size instead of being copied with them.
+    """
+    def __init__(self, maxpoint):
+        rng = random.Random(ZOBRIST_SEED + maxpoint)
+        # stone keys indexed by [color][point]
+        self.stones = [None,
+                       [rng.getrandbits(64) for _ in range(maxpoint)],
+                       [rng.getrandbits(64) for _ in range(maxpoint)]]
+        self.side = rng.getrandbits(64)
+        self.ko = [rng.getrandbits(64) for _ in range(maxpoint)]
+
+def zobrist_table(maxpoint):
+    if maxpoint not in _zobrist_tables:
+        _zobrist_tables[maxpoint] = ZobristTable(maxpoint)
+    return _zobrist_tables[maxpoint]
+
+class MarkArray(object):
+    """
+    Reusable visited marks for flood fills. A new fill bumps the generation
+    instead of clearing or copying anything, a point is visited in the
+    current fill if its mark equals the generation. Shared by all boards of
+    the same size, so fills must not be nested.
+    """
+    def __init__(self, maxpoint):
+        self.marks = [0]*maxpoint
+        self.gen = 0
+
+    def next_gen(self):
+        self.gen += 1
+        return self.gen
+
+_mark_arrays = {}
+
+def mark_array(maxpoint):
+    if maxpoint not in _mark_arrays:
+        _mark_arrays[maxpoint] = MarkArray(maxpoint)
+    return _mark_arrays[maxpoint]
+
+_geometries = {}
+
+class BoardGeometry(object):
+    """
+    Everything about a board that only depends on its size, computed once
+    per size and shared by all boards of that size. Nothing in here may be
+    changed after construction.
+
+    The board array is one-dimensional 
+    Conversion from row, col format: see _coord_to_point function
+    This is an example point numbering (indices of numpy array)
+    on a 3x3 board. Spaces are added for illustration to separate 
+    board points from border points.
+    There is only a one point buffer between each row (e.g. point 12).
+    
+    16   17 18 19   20
+    
+    12   13 14 15   16
+    08   09 10 11   12
+    04   05 06 07   08
+    
+    00   01 02 03   04
+    
+    This is the content of the array after initialization,
+    if we copy it into a 2d array with padding.
+    Codes are EMPTY = 0, BORDER = 3
+    [ 3, 3, 3, 3, 3, 0, 0, 0, 3, 0, 0, 0, 3, 0, 0, 0, 3, 3, 3, 3, 3]
+    
+    3  3  3  3  3
+    3  0  0  0  3
+    3  0  0  0  3
+    3  0  0  0  3
+    3  3  3  3  3
+
+    Per point tables are indexed by point and only filled in for points on
+    the board:
+        neighbors : list of the on-board neighbors (a dict, as neighbors_dic)
+        diag_neighbors : the four diagonal points, border points included
+        neighbor_masks, diag_masks : the same as bitboards, for BitGoBoard
+        positions_33 : the nine points of the 3x3 neighborhood, row by row
+        line : distance to the edge, 1 on the first line
+        coords : (row, col)
+        point_strings : the GTP name of the point, e.g. 'c4'
+    """
+    def __init__(self, size):
+        NS = size + 1
+        self.size = size
+        self.NS = NS
+        self.maxpoint = size*size + 3*(size+1)
+        board = np.ones((self.maxpoint),dtype=np.int16)*BORDER
+        points = []
+        for row in range(1, size+1):
+            for col in range(1, size+1):
+                points.append(NS*row + col)
+        board[points] = EMPTY
+        board.flags.writeable = False
+        self.empty_board = board
+        self.points = tuple(points)
+        self.empty_index = [-1]*self.maxpoint
+        for i, p in enumerate(points):
+            self.empty_index[p] = i
+        self.on_board_mask = 0
+        self.neighbor_masks = [0]*self.maxpoint
+        self.diag_masks = [0]*self.maxpoint
+        self.neighbors = {}
+        self.diag_neighbors = [None]*self.maxpoint
+        self.positions_33 = [None]*self.maxpoint
+        self.line = [0]*self.maxpoint
+        self.coords = [None]*self.maxpoint
+        self.point_strings = [None]*self.maxpoint
+        for p in points:
+            self.on_board_mask |= 1 << p
+            self.neighbors[p] = [n for n in [p-1, p+1, p-NS, p+NS] if board[n] != BORDER]
+            self.diag_neighbors[p] = [p-NS-1, p-NS+1, p+NS-1, p+NS+1]
+            for n in self.neighbors[p]:
+                self.neighbor_masks[p] |= 1 << n
+            for d in self.diag_neighbors[p]:
+                self.diag_masks[p] |= 1 << d
+            self.positions_33[p] = [p-NS-1, p-NS, p-NS+1,
+                                    p-1, p, p+1,
+                                    p+NS-1, p+NS, p+NS+1]
+            row, col = divmod(p, NS)
+            self.line[p] = min(row, col, size+1-row, size+1-col)
+            self.coords[p] = (row, col)
+            self.point_strings[p] = GoBoardUtil.format_point((row, col))
+        self.zobrist = zobrist_table(self.maxpoint)
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
 
 class SimpleGoBoard(object):
 
+    # fields which copy() and restore() share between boards, they are
+    # either immutable or shared between all boards of the same size
+    _shared_fields = ('size', 'NS', 'WE', 'maxpoint', 'check_suicide', 'check_superko',
+                      '_is_empty', 'ko_constraint', 'passes_white', 'passes_black',
+                      'white_captures', 'black_captures', 'current_player', 'winner',
+                      'num_pass', 'last_move', 'last2_move', 'neighbors_dic',
+                      '_geometry', '_zobrist', '_marks', '_stones_key')
+    # lists which copy() and restore() copy element by element
+    _mutable_lists = ('moves', 'ko_constraints', 'captured_stones', 'pass_record',
+                      'last2_moves', 'player_record', '_empty_positions', '_empty_index',
+                      '_string_of', '_next_stone', '_string_size',
+                      '_pseudo_libs', '_lib_sum', '_lib_sumsq', '_key_history')
+    __slots__ = _shared_fields + _mutable_lists + ('board', '_key_counts')
+    name = "Board 1D"
+    version = 0.1
+
     def move(self, point, color):
         """
         Play a move on the board.
@@ -30,22 +185,29 @@ class SimpleGoBoard(object):
         color
         """
         previous_pass=self.num_pass
+        previous_ko=self.ko_constraint
+        if point != None and self.check_superko and self._repeats_position(point, color):
+            return False
         move_inspection, msg, caps = self._play_move(point,color)
         if not move_inspection:
             return False
         else:
+            self.player_record.append(self.current_player)
             self.current_player = GoBoardUtil.opponent(color)
             self.moves.append(point)
-            self.ko_constraints.append(self.ko_constraint)
+            self.ko_constraints.append(previous_ko)
             self.captured_stones.append(caps)
             self.pass_record.append(previous_pass)
+            self.last2_moves.append(self.last2_move)
             self.last2_move = self.last_move
             self.last_move = point
             # update played and captured positions to the empty positions
             if point:
-                self._empty_positions.remove(point)
+                self._remove_empty(point)
             if caps is not None:
-                self._empty_positions.extend(caps)
+                for p in caps:
+                    self._add_empty(p)
+            self._push_key()
             return True
                 
     # Undo and restore the full previous board state
@@ -55,15 +217,34 @@ class SimpleGoBoard(object):
         self.ko_constraint = self.ko_constraints.pop()
         caps = self.captured_stones.pop()
         self.num_pass=self.pass_record.pop()
+        self.last_move = self.last2_move
+        self.last2_move = self.last2_moves.pop()
+        self._pop_key()
         if last_point != None:
+            color = self.board[last_point]
+            c = GoBoardUtil.opponent(color)
+            if color == WHITE:
+                self.white_captures -= len(caps)
+            else:
+                self.black_captures -= len(caps)
+            self._stones_key ^= self._zobrist.stones[color][last_point]
+            for p in caps:
+                self._stones_key ^= self._zobrist.stones[c][p]
             self.board[last_point] = EMPTY
-            self.liberty_dp[last_point] = -1
-            self._empty_positions.append(last_point)
-            c = self.current_player
+            self._add_empty(last_point)
             for p in caps:
                 self.board[p] = c
-                self._empty_positions.remove(p)
-        self.current_player = GoBoardUtil.opponent(self.current_player);
+                self._remove_empty(p)
+            self._lift_stone(last_point, caps)
+            self._is_empty = len(self._empty_positions) == self.size*self.size
+        self.current_player = self.player_record.pop()
+
+    def undo_to(self, num_moves):
+        """
+        Undo moves until only the first num_moves moves are left on the stack.
+        """
+        while len(self.moves) > num_moves:
+            self.undo_move()
 
     @staticmethod
     def showboard(board,bd_size):
@@ -95,21 +276,9 @@ class SimpleGoBoard(object):
             return False
         if point == self.ko_constraint:
             return False
-        # tentatively place the stone and check capture and suicide
-        self.board[point] = color
-        neighbors = self._neighbors(point)
-        opp = GoBoardUtil.opponent(color)
-        for n in neighbors:
-            assert self.board[n] != BORDER
-            if self.board[n] == opp:
-                hasLiberty,fboard = self._liberty_flood(n)
-                if not hasLiberty:
-                    self.board[point] = EMPTY
-                    return True
-        is_legal = (not self.check_suicide) or self._liberty_flood(point)[0]
-        # remove the stone again
-        self.board[point] = EMPTY
-        return is_legal
+        if self.check_suicide and self._is_suicide(point, color):
+            return False
+        return not (self.check_superko and self._repeats_position(point, color))
 
     def get_twoD_board(self):
         """
@@ -146,12 +315,12 @@ class SimpleGoBoard(object):
             size of board to reset to
             """
         
-        self.name = "Board 1D"
-        self.version = 0.1
+        geometry = board_geometry(size)
         self.size = size
-        self.NS = size + 1
+        self.NS = geometry.NS
         self.WE=  1
         self.check_suicide = True
+        self.check_superko = False
         self._is_empty = True
         self.ko_constraint = None
         self.passes_white = 0
@@ -161,67 +330,149 @@ class SimpleGoBoard(object):
         self.current_player= BLACK
         self.winner = None
         self.num_pass = 0
-        self.maxpoint = size*size + 3*(size+1)  
-        self.liberty_dp = np.ones((self.maxpoint),dtype=np.int16)*-1
+        self.maxpoint = geometry.maxpoint
         self.moves = [] # stack of moves
         self.ko_constraints = [] # stack of ko constraines
         self.captured_stones = [] # stacke of captured stones
         self.pass_record = []
+        self.last2_moves = [] # stack of previous last2_move
+        self.player_record = [] # stack of previous current_player
         self.last_move = None
         self.last2_move = None
+        # The board layout is described in BoardGeometry, everything that
+        # only depends on the size is shared through the geometry
+        self._geometry = geometry
+        self.board = geometry.empty_board.copy()
+        # Empty points are kept in a dense list in arbitrary order, with the
+        # position of every point in the list in _empty_index (-1 if occupied)
+        self._empty_positions = list(geometry.points)
+        self._empty_index = geometry.empty_index[:]
+        self.neighbors_dic = geometry.neighbors
+        self._init_strings()
+        # Zobrist keys, _stones_key only covers the stones and is what the
+        # positional superko history records
+        self._zobrist = geometry.zobrist
+        self._marks = mark_array(self.maxpoint)
+        self._stones_key = 0
+        self._key_history = [0]
+        self._key_counts = {0: 1}
 
+    def _init_strings(self):
         """
-        The board array is one-dimensional 
-        Conversion from row, col format: see _coord_to_point function
-        This is an example point numbering (indices of numpy array)
-        on a 3x3 board. Spaces are added for illustration to separate 
-        board points from border points.
-        There is only a one point buffer between each row (e.g. point 12).
-        
-        16   17 18 19   20
-        
-        12   13 14 15   16
-        08   09 10 11   12
-        04   05 06 07   08
-        
-        00   01 02 03   04
-        
-        This is the content of the array after initialization,
-        if we copy it into a 2d array with padding.
-        Codes are EMPTY = 0, BORDER = 3
-        [ 3, 3, 3, 3, 3, 0, 0, 0, 3, 0, 0, 0, 3, 0, 0, 0, 3, 3, 3, 3, 3]
-        
-        3  3  3  3  3
-        3  0  0  0  3
-        3  0  0  0  3
-        3  0  0  0  3
-        3  3  3  3  3
-        """
-        self.board = np.ones((self.maxpoint),dtype=np.int16)*BORDER
-        self._empty_filling(self.board)
-        self._empty_positions = list(np.where(self.board == 0)[0])
-        # Init neighbors dict
-        self.neighbors_dic = {}
-        for p in self._empty_positions:
-            self.neighbors_dic[p] = []
-            for n in self._neighbor_pos(p):
-                if self.board[n] == BORDER:
-                    continue
-                self.neighbors_dic[p].append(n)
+        Incremental string table. Every stone maps to the anchor of its
+        string and the stones of a string form a ring through _next_stone.
+        The anchor holds the size and the pseudo liberties of the string:
+        their count, sum and sum of squares, which tell in O(1) whether
+        the string has no liberty or exactly one.
+        """
+        self._string_of = [None]*self.maxpoint
+        self._next_stone = [0]*self.maxpoint
+        self._string_size = [0]*self.maxpoint
+        self._pseudo_libs = [0]*self.maxpoint
+        self._lib_sum = [0]*self.maxpoint
+        self._lib_sumsq = [0]*self.maxpoint
 
     def _neighbors(self,point):
         return self.neighbors_dic[point]
     
-    def _neighbor_pos(self, point):
-        return [point-1, point+1, point-self.NS, point+self.NS]
-
     def copy(self):
-        """Return an independent copy of this Board."""
-        copy_board = SimpleGoBoard(self.size)
-        copy_board.__dict__ = copy.deepcopy(self.__dict__)
-        assert copy_board.board.all() == self.board.all()
+        """
+        Return an independent copy of this Board.
+        The geometry and the Zobrist table are shared with the copy, only
+        the board array, the string table and the move stacks are copied.
+        """
+        copy_board = type(self).__new__(type(self))
+        for name in self._shared_fields:
+            setattr(copy_board, name, getattr(self, name))
+        copy_board.board = self.board.copy()
+        for name in self._mutable_lists:
+            setattr(copy_board, name, getattr(self, name)[:])
+        copy_board._key_counts = dict(self._key_counts)
         return copy_board
 
+    def snapshot(self, into=None):
+        """
+        Return a snapshot of the current position for restore().
+        The snapshot is a board copy which must not be played on while
+        boards are restored from it. into, an earlier snapshot or copy of
+        a board of the same class, is overwritten and returned instead of
+        allocating a new board, so a search can keep its snapshot and
+        scratch board from one move to the next.
+        """
+        if into is None or type(into) is not type(self):
+            return self.copy()
+        into.restore(self)
+        return into
+
+    def restore(self, snapshot):
+        """
+        Overwrite this board with the position in snapshot, reusing the
+        arrays and lists of this board.
+        Arguments:
+        snapshot -- a board returned by snapshot() or copy()
+        """
+        for name in self._shared_fields:
+            setattr(self, name, getattr(snapshot, name))
+        if self.board.shape == snapshot.board.shape:
+            self.board[:] = snapshot.board
+        else:
+            self.board = snapshot.board.copy()
+        for name in self._mutable_lists:
+            getattr(self, name)[:] = getattr(snapshot, name)
+        self._key_counts.clear()
+        self._key_counts.update(snapshot._key_counts)
+
+    def to_bytes(self):
+        """
+        Compact encoding of the position for other processes: a short
+        header and one byte per point. The move history is not included.
+        """
+        header = _BYTES_HEADER.pack(self.size, self.current_player, self.num_pass,
+                                    self.ko_constraint or 0, self.last_move or 0,
+                                    self.last2_move or 0)
+        return header + self.board.astype(np.int8).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Return a new board with the position encoded by to_bytes.
+        """
+        size, current_player, num_pass, ko, last_move, last2_move = \
+            _BYTES_HEADER.unpack_from(data)
+        board = cls(size)
+        board.board[:] = np.frombuffer(data, dtype=np.int8, offset=_BYTES_HEADER.size)
+        board.current_player = current_player
+        board.num_pass = num_pass
+        board.ko_constraint = ko or None
+        board.last_move = last_move or None
+        board.last2_move = last2_move or None
+        board._load_stones()
+        return board
+
+    def _load_stones(self):
+        """
+        Bring the empty points, the string table and the Zobrist keys in
+        line with stones written directly into the board array of an
+        empty board.
+        """
+        for p in self._geometry.points:
+            color = self.board[p]
+            if color != EMPTY:
+                self._remove_empty(p)
+                self._stones_key ^= self._zobrist.stones[color][p]
+        self._is_empty = len(self._empty_positions) == self.size*self.size
+        self._key_history = [self._stones_key]
+        self._key_counts = {self._stones_key: 1}
+        self._build_strings()
+
+    def _build_strings(self):
+        """
+        Build the string table of all stones on the board from scratch.
+        """
+        for p in self._geometry.points:
+            if self.board[p] != EMPTY and self._string_of[p] is None:
+                self._make_string(p)
+
     def get_empty_points(self):
         """
         Argumnets:
@@ -232,19 +483,41 @@ class SimpleGoBoard(object):
         """
         return self._empty_positions[:]
 
-    def _empty_filling(self,board):
+    def random_empty_points(self):
         """
-        Fills points inside board with EMPTY
-        Arguments
-        ---------
-        board : numpy array
-            receives a numpy array filled with BORDER
-
+        Generate the empty points in random order without copying them.
+        The empty point list is shuffled in place as it goes, so the board
+        must not be changed until the caller stops iterating.
         """
-        for ind in range(1,self.size+1,1):
-            indices = [j for j in range(ind*self.NS + 1,ind*self.NS+self.size+1,1)]
-            np.put(board,indices, EMPTY)
+        empty = self._empty_positions
+        index = self._empty_index
+        num = len(empty)
+        for k in range(num):
+            j = k + int(random.random()*(num-k))
+            p = empty[j]
+            if j != k:
+                q = empty[k]
+                empty[k] = p
+                empty[j] = q
+                index[p] = k
+                index[q] = j
+            yield p
 
+    def _add_empty(self, point):
+        self._empty_index[point] = len(self._empty_positions)
+        self._empty_positions.append(point)
+
+    def _remove_empty(self, point):
+        """
+        Remove point from the empty points by moving the last empty point
+        into its slot.
+        """
+        i = self._empty_index[point]
+        last = self._empty_positions.pop()
+        if last != point:
+            self._empty_positions[i] = last
+            self._empty_index[last] = i
+        self._empty_index[point] = -1
 
     def is_eye(self,point,color):
         """
@@ -336,90 +609,271 @@ class SimpleGoBoard(object):
         Helper function for returning number of liberty and 
         last liberty for the point
         """
-        group_points = [point]
-        liberty = 0
-        met_points = [point]
-        while group_points:
-            p=group_points.pop()
-            met_points.append(p)
-            neighbors = self._neighbors(p)
-            for n in neighbors:
-                if n not in met_points:
-                    assert self.board[n] != BORDER
-                    if self.board[n] == color: 
-                        group_points.append(n)
-                    elif self.board[n]==EMPTY:
-                        liberty += 1
-                        single_lib_point = n
-                    met_points.append(n)
+        libs = self._string_liberties(self._string_of[point])
+        liberty = len(libs)
         if liberty == 1:
-            return liberty, single_lib_point
+            return liberty, libs[0]
         return liberty, None
 
-    def _liberty_flood_rec(self,fboard,point,color):
-        fboard[point] = FLOODFILL
-        neighbors = self._neighbors(point)
-        for n in neighbors:
-            if fboard[n] == EMPTY:
-                return True,n
-            if fboard[n] == color:
-                res,lp=self._liberty_flood_rec(fboard,n,color)
-                if res:
-                    return True, lp
-        return False, None
-
-    def _liberty_flood(self, point):
-        """
-        This function find the liberties of flood filled board.
-        return True if it finds any liberty and False otherwise
+    @property
+    def zobrist_key(self):
+        """
+        64-bit key of the position: stones, side to move and ko_constraint.
+        """
+        key = self._stones_key
+        if self.current_player == WHITE:
+            key ^= self._zobrist.side
+        if self.ko_constraint != None:
+            key ^= self._zobrist.ko[self.ko_constraint]
+        return key
+
+    def _push_key(self):
+        key = self._stones_key
+        self._key_history.append(key)
+        self._key_counts[key] = self._key_counts.get(key, 0) + 1
+
+    def _pop_key(self):
+        key = self._key_history.pop()
+        self._key_counts[key] -= 1
+        if self._key_counts[key] == 0:
+            del self._key_counts[key]
+
+    def _repeats_position(self, point, color):
+        """
+        Check whether playing color on point recreates an earlier position
+        (positional superko). The resulting key is computed from the strings
+        the move would capture, without playing it.
+        """
+        key = self._stones_key ^ self._zobrist.stones[color][point]
+        opp = GoBoardUtil.opponent(color)
+        captured = []
+        for n in self._neighbors(point):
+            head = self._string_of[n]
+            if head is None or head in captured or self.board[n] != opp:
+                continue
+            if self._in_atari(head):
+                captured.append(head)
+                for s in self._string_stones(head):
+                    key ^= self._zobrist.stones[opp][s]
+        return key in self._key_counts
+
+    def _is_suicide(self, point, color):
+        """
+        Check whether playing color on the empty point leaves its string
+        without liberties, only looking at the strings next to the point.
         Arguments
         ---------
-        board : numpy array
+        point, color
 
         Return
         ---------
-        bool:
-             whether the flood filled group in the board has any liberty
-        """
-        dp_point=self.liberty_dp[point]
-        if dp_point != -1 and self.board[dp_point] == EMPTY:
-            return True, dp_point
-        fboard = np.array(self.board, copy=True)
-        color = fboard[point]
-        res,lp = self._liberty_flood_rec(fboard,point,color)
-        if(res==True):
-            return res, lp
-        else:
-            return res, fboard
+        bool
+        """
+        for n in self._neighbors(point):
+            head = self._string_of[n]
+            if head is None:
+                return False
+            # a neighboring string in atari has point as its last liberty
+            if self.board[n] == color:
+                if not self._in_atari(head):
+                    return False
+            elif self._in_atari(head):
+                # the move captures this string
+                return False
+        return True
 
+    def _in_atari(self, head):
+        """
+        Whether the string anchored at head has exactly one liberty, i.e. all
+        of its pseudo liberties are the same point.
+        """
+        num = self._pseudo_libs[head]
+        return num > 0 and num*self._lib_sumsq[head] == self._lib_sum[head]**2
 
-    def _flood_fill(self, point):
+    def _string_stones(self, head):
         """
-        Creates a new board and fills the connected groups to the given point
+        List of the stones of the string anchored at head.
+        """
+        stones = [head]
+        s = self._next_stone[head]
+        while s != head:
+            stones.append(s)
+            s = self._next_stone[s]
+        return stones
+
+    def _string_liberties(self, head):
+        """
+        List of the liberties of the string anchored at head.
+        """
+        marks = self._marks.marks
+        gen = self._marks.next_gen()
+        libs = []
+        for s in self._string_stones(head):
+            for n in self._neighbors(s):
+                if self._string_of[n] is None and marks[n] != gen:
+                    marks[n] = gen
+                    libs.append(n)
+        return libs
+
+    def _add_liberty(self, head, point, delta):
+        self._pseudo_libs[head] += delta
+        self._lib_sum[head] += delta*point
+        self._lib_sumsq[head] += delta*point*point
+
+    def _place_stone(self, point, color):
+        """
+        Put a stone on the board and update the string table: merge with the
+        neighboring friendly strings and remove opponent strings left without
+        liberties.
         Arguments
         ---------
-        point
+        point, color
 
         Return
         ---------
-         a new board with points in the neighbor of given point 
-         with same color replaced with
-         FLOODFILL(=4)
-         This is based on https://github.com/pasky/michi/blob/master/michi.py --> floodfill
-        """
-        fboard = np.array(self.board, copy=True)
-        pointstack = [point]
-        color = fboard[point]
-        fboard[point] = FLOODFILL
-        while pointstack:
-            current_point = pointstack.pop()
-            neighbors = self._neighbors(current_point)
-            for n in neighbors :
-                if fboard[n] == color:
-                    fboard[n] = FLOODFILL
-                    pointstack.append(n)
-        return fboard
+        caps : list of captured points
+        single_captures : list of points of strings captured with a single stone
+        """
+        self.board[point] = color
+        self._stones_key ^= self._zobrist.stones[color][point]
+        string_of = self._string_of
+        string_of[point] = point
+        self._next_stone[point] = point
+        self._string_size[point] = 1
+        self._pseudo_libs[point] = 0
+        self._lib_sum[point] = 0
+        self._lib_sumsq[point] = 0
+        friends = []
+        enemies = []
+        for n in self._neighbors(point):
+            head = string_of[n]
+            if head is None:
+                self._add_liberty(point, n, 1)
+                continue
+            self._add_liberty(head, point, -1)
+            if self.board[n] == color:
+                if head not in friends:
+                    friends.append(head)
+            elif head not in enemies:
+                enemies.append(head)
+        head = point
+        for h in friends:
+            head = self._merge_strings(head, h)
 
+        caps = []
+        single_captures = []
+        for h in enemies:
+            if self._pseudo_libs[h] == 0:
+                captured = self._remove_string(h)
+                if len(captured) == 1:
+                    single_captures.append(captured[0])
+                caps.extend(captured)
+        return caps, single_captures
+
+    def _merge_strings(self, a, b):
+        """
+        Merge the strings anchored at a and b, relabeling the smaller one.
+        Return the anchor of the merged string.
+        """
+        if self._string_size[a] < self._string_size[b]:
+            a, b = b, a
+        for s in self._string_stones(b):
+            self._string_of[s] = a
+        nxt = self._next_stone
+        nxt[a], nxt[b] = nxt[b], nxt[a]
+        self._string_size[a] += self._string_size[b]
+        self._pseudo_libs[a] += self._pseudo_libs[b]
+        self._lib_sum[a] += self._lib_sum[b]
+        self._lib_sumsq[a] += self._lib_sumsq[b]
+        return a
+
+    def _remove_string(self, head):
+        """
+        Remove a captured string from the board, its points become liberties of
+        the neighboring strings.
+        """
+        keys = self._zobrist.stones[self.board[head]]
+        stones = self._dissolve_string(head)
+        for s in stones:
+            self._stones_key ^= keys[s]
+            self.board[s] = EMPTY
+        for s in stones:
+            for n in self._neighbors(s):
+                h = self._string_of[n]
+                if h is not None:
+                    self._add_liberty(h, s, 1)
+        return stones
+
+    def _dissolve_string(self, head):
+        """
+        Drop a string from the string table and return its stones.
+        """
+        stones = self._string_stones(head)
+        for s in stones:
+            self._string_of[s] = None
+        return stones
+
+    def _make_string(self, point):
+        """
+        Build the string table entry for the string containing point
+        directly from the board.
+        """
+        color = self.board[point]
+        string_of = self._string_of
+        string_of[point] = point
+        self._next_stone[point] = point
+        self._string_size[point] = 1
+        self._pseudo_libs[point] = 0
+        self._lib_sum[point] = 0
+        self._lib_sumsq[point] = 0
+        stack = [point]
+        while stack:
+            p = stack.pop()
+            for n in self._neighbors(p):
+                c = self.board[n]
+                if c == EMPTY:
+                    self._add_liberty(point, n, 1)
+                elif c == color and string_of[n] is None:
+                    string_of[n] = point
+                    self._next_stone[n] = self._next_stone[point]
+                    self._next_stone[point] = n
+                    self._string_size[point] += 1
+                    stack.append(n)
+
+    def _lift_stone(self, point, caps):
+        """
+        Update the string table after undo_move took the stone on point off
+        the board and put the stones it captured back.
+        """
+        head = self._string_of[point]
+        if not caps and self._string_size[head] == 1:
+            # a lone stone without captures, only give back its liberty
+            self._string_of[point] = None
+            for n in self._neighbors(point):
+                h = self._string_of[n]
+                if h is not None:
+                    self._add_liberty(h, point, 1)
+        else:
+            self._dissolve_string(head)
+            self._rebuild_strings_around([point] + caps)
+
+    def _rebuild_strings_around(self, points):
+        """
+        Rebuild the strings on and next to the given points after they have
+        been changed on the board without going through _place_stone.
+        """
+        heads = set()
+        for p in points:
+            for q in [p] + self._neighbors(p):
+                h = self._string_of[q]
+                if h is not None:
+                    heads.add(h)
+        for h in heads:
+            self._dissolve_string(h)
+        for p in points:
+            for q in [p] + self._neighbors(p):
+                if self.board[q] != EMPTY and self._string_of[q] is None:
+                    self._make_string(q)
 
     def _play_move(self, point, color):
         """
@@ -448,55 +902,24 @@ class SimpleGoBoard(object):
         if point == self.ko_constraint:
             msg ="KO move is not permitted!"
             return False , msg, None
+        if self.check_suicide and self._is_suicide(point, color):
+            c = self._point_to_coord(point)
+            msg = "Suicide move with color %s in the row and column: %d %d "%(color, c[0],c[1])
+            return False, msg, None
         in_enemy_eye = self._is_eyeish(point) == GoBoardUtil.opponent(color)
-        self.board[point] = color
         self._is_empty = False
-        caps = []
-        single_captures = []
-        neighbors = self._neighbors(point)
-        cap_inds = None
-        for n in neighbors:
-            assert self.board[n] != BORDER
-            if self.board[n] != color:
-                if self.board[n] != EMPTY:
-                    hasLiberty, fboard = self._liberty_flood(n)
-                    if not hasLiberty:
-                        cap_inds = fboard==FLOODFILL
-                        caps.extend(list(*np.where(fboard==FLOODFILL)))
-                        num_captures = np.sum(cap_inds)
-                        if num_captures == self.size*self.size:
-                            self._is_empty = True
-                        if num_captures == 1:
-                            single_captures.append(n)
-                        if color == WHITE:
-                            self.white_captures += num_captures
-                        else :
-                            self.black_captures += num_captures
-                        self.liberty_dp[cap_inds] = -1
-                        self.board[cap_inds] = EMPTY
+        caps, single_captures = self._place_stone(point, color)
+        num_captures = len(caps)
+        if num_captures == self.size*self.size:
+            self._is_empty = True
+        if color == WHITE:
+            self.white_captures += num_captures
+        else :
+            self.black_captures += num_captures
         self.ko_constraint = single_captures[0] if in_enemy_eye and len(single_captures) == 1 else None
-        if (not self.check_suicide):
-            #not check suicidal move
-            c = self._point_to_coord(point)
-            msg = "Playing a move with %s color in the row and column %d %d is permitted"%(color,c[0],c[1])
-            return True, msg, caps
-        else:
-            res,lp=self._liberty_flood(point)
-            if res==True:
-                #non suicidal move
-                self.liberty_dp[point]=lp
-                c = self._point_to_coord(point)
-                msg = "Playing a move with %s color in the row and column %d %d is permitted"%(color,c[0],c[1])
-                return True, msg, caps
-            else:
-                # undoing the move because of being suicidal
-                # think cap_inds must be None?
-                self.board[point] = EMPTY
-                if cap_inds!= None:
-                    self.board[cap_inds] = GoBoardUtil.opponent(color)
-                c = self._point_to_coord(point)
-                msg = "Suicide move with color %s in the row and column: %d %d "%(color, c[0],c[1])
-                return False, msg, None
+        c = self._point_to_coord(point)
+        msg = "Playing a move with %s color in the row and column %d %d is permitted"%(color,c[0],c[1])
+        return True, msg, caps
     
     def _diag_neighbors(self, point):
         """
@@ -510,8 +933,7 @@ class SimpleGoBoard(object):
         points : list of int
             coordinate of points which are diagnoal neighbors of the given point
         """
-        return [point-self.NS-1, point-self.NS+1,
-                point+self.NS-1, point+self.NS+1]
+        return self._geometry.diag_neighbors[point]
 
     def _border_removal(self, points):
         """
@@ -611,43 +1033,46 @@ class SimpleGoBoard(object):
         return self.num_pass >= 2
 
     def score(self, komi):
-        """ Score """
-        black_score = 0
-        white_score = komi
-        counted = []
-        for x in range(1, self.size+1):
-            for y in range(1, self.size+1):
-                point = self._coord_to_point(x,y)
-                if point in counted:
-                    continue
-                color = self.get_color(point)
-                assert color != BORDER
-                if color == BLACK:
-                    black_score += 1
-                    continue
-                if color == WHITE:
-                    white_score += 1
-                    continue
-                fboard = self._flood_fill(point)
-                empty_block = list(*np.where(fboard == FLOODFILL))
-                black_flag = False
-                white_flag = False
-                for p in empty_block:
-                    counted.append(p)
-                    p_neighbors = self._neighbors(p)
-                    found_black = self.board[p_neighbors]==BLACK
-                    found_white = self.board[p_neighbors]==WHITE
-                    if found_black.any():
-                        black_flag = True
-                    if found_white.any():
-                        white_flag = True
-                    if black_flag and white_flag:
-                        break
-                if black_flag and not white_flag:
-                    black_score += len(empty_block)
-                if white_flag and not black_flag:
-                    white_score += len(empty_block)
-    
+        """
+        Area score. Stones are counted directly and every empty region is
+        labeled in a single flood with the shared mark array, it counts for
+        a color if it only touches stones of that color.
+        """
+        board = self.board.tolist()
+        black_score = board.count(BLACK)
+        white_score = board.count(WHITE) + komi
+        marks = self._marks.marks
+        gen = self._marks.next_gen()
+        neighbors_dic = self.neighbors_dic
+        for point in self._empty_positions:
+            if marks[point] == gen:
+                continue
+            marks[point] = gen
+            region_size = 1
+            # BLACK | WHITE when the region touches both colors
+            border_colors = EMPTY
+            pointstack = [point]
+            while pointstack:
+                p = pointstack.pop()
+                for n in neighbors_dic[p]:
+                    c = board[n]
+                    if c != EMPTY:
+                        border_colors |= c
+                    elif marks[n] != gen:
+                        marks[n] = gen
+                        region_size += 1
+                        pointstack.append(n)
+            if border_colors == BLACK:
+                black_score += region_size
+            elif border_colors == WHITE:
+                white_score += region_size
+        return self._winner(black_score, white_score)
+
+    @staticmethod
+    def _winner(black_score, white_score):
+        """
+        Return the winner and the margin for the given area scores.
+        """
         if black_score > white_score:
             return BLACK, black_score-white_score
 
@@ -709,6 +1134,9 @@ class SimpleGoBoard(object):
                     continue
                 if point in anchor_dic:
                     continue
+                marks = self._marks.marks
+                gen = self._marks.next_gen()
+                marks[point] = gen
                 stack_points = [point]
                 block_points = [point]
                 min_index = point
@@ -717,10 +1145,9 @@ class SimpleGoBoard(object):
                     current_point = stack_points.pop()
                     neighbors = self._neighbors(current_point)
                     for n in neighbors :
-                        if n not in block_points:
-                            if self.get_color(n) == BORDER:
-                                continue
+                        if marks[n] != gen:
                             if self.get_color(n) == color:
+                                marks[n] = gen
                                 stack_points.append(n)
                                 block_points.append(n)
                                 if n < min_index:
@@ -778,10 +1205,7 @@ class SimpleGoBoard(object):
         patterns :
         Set of patterns in the same format of what michi pattern base provides. Please refer to pattern.py to see the format of the pattern.
         """
-        positions = [point-self.NS-1, point-self.NS, point-self.NS+1,
-                     point-1, point, point+1,
-                     point+self.NS-1, point+self.NS, point+self.NS+1]
-                     
+        positions = self._geometry.positions_33[point]
         pattern = ""
         for d in positions:
             if self.board[d] == self.current_player:
@@ -815,6 +1239,5 @@ class SimpleGoBoard(object):
     def point_to_string(self, point):
         if point == None:
             return 'Pass'
-        x, y = GoBoardUtil.point_to_coord(point, self.NS)
-        return GoBoardUtil.format_point((x, y))
+        return self._geometry.point_strings[point]
 